@@ -0,0 +1,119 @@
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT / "src"))
+
+from eth_account import Account  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+from calldata import FinalizeCallEncoder  # noqa: E402
+
+# Checks that FinalizeCallEncoder signs to the same raw transactions as web3's
+# ContractFunction.buildTransaction, for both contracts and both fee types, then times
+# build and build+sign per tx on each path. No node is needed: every field
+# buildTransaction would otherwise fetch is given, so any RPC call fails the check.
+#
+#   python3 bench/calldata_equivalence.py --txs 2000
+
+CONTRACTS = (
+    ("BlockSpecimenProofChainContractABI", "finalizeAndRewardSpecimenSession"),
+    ("BlockResultProofChainContractABI", "finalizeAndRewardResultSession"),
+)
+FEES = {
+    "legacy": {"gasPrice": 10**9},
+    "eip1559": {"maxFeePerGas": 3 * 10**9, "maxPriorityFeePerGas": 10**8},
+}
+ADDRESS = Web3.toChecksumAddress("0x" + "ab" * 20)
+KEY = Account.from_key(b"\x01" * 32)
+UINT64_EDGES = (0, 1, 2**32, 2**63, FinalizeCallEncoder.UINT64_MAX)
+
+
+def arguments(count, rng):
+    # edge values first, then random ones
+    edges = [(c, h) for c in UINT64_EDGES for h in UINT64_EDGES]
+    randoms = [
+        (rng.randrange(2**64), rng.randrange(2**64))
+        for _ in range(count - len(edges))
+    ]
+    return (edges + randoms)[:count]
+
+
+def build_web3(contract, function_name, args, fields):
+    return [
+        contract.functions[function_name](chainId, blockHeight).buildTransaction(
+            {"from": KEY.address, **fields}
+        )
+        for chainId, blockHeight in args
+    ]
+
+
+def build_encoder(encoder, args, fields):
+    return [
+        encoder.transaction(chainId, blockHeight, fields)
+        for chainId, blockHeight in args
+    ]
+
+
+def sign(w3, transactions):
+    return [
+        w3.eth.account.signTransaction(tx, private_key=KEY.key).rawTransaction
+        for tx in transactions
+    ]
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--txs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # unreachable on purpose
+    w3 = Web3(Web3.HTTPProvider("http://127.0.0.1:9"))
+    rng = random.Random(args.seed)
+    for abi_name, function_name in CONTRACTS:
+        abi_path = ROOT / "abi" / abi_name
+        with abi_path.open("r") as f:
+            contract = w3.eth.contract(address=ADDRESS, abi=f.read())
+        encoder = FinalizeCallEncoder(abi_path, function_name, ADDRESS)
+        for fee_type, fees in FEES.items():
+            calls = arguments(args.txs, rng)
+            fields = {"gas": 300000, **fees, "nonce": 7, "chainId": 1284}
+
+            web3_txs, web3_build = timed(
+                lambda: build_web3(contract, function_name, calls, fields)
+            )
+            encoder_txs, encoder_build = timed(
+                lambda: build_encoder(encoder, calls, fields)
+            )
+            web3_raw, web3_sign = timed(lambda: sign(w3, web3_txs))
+            encoder_raw, encoder_sign = timed(lambda: sign(w3, encoder_txs))
+
+            mismatches = sum(1 for a, b in zip(web3_raw, encoder_raw) if a != b)
+            if mismatches:
+                raise SystemExit(
+                    f"{function_name} {fee_type}: {mismatches} of {len(calls)} raw txs differ"
+                )
+
+            def per_tx(seconds):
+                return f"{seconds / len(calls) * 10**6:.1f}us"
+
+            print(
+                f"{function_name} {fee_type}: {len(calls)} byte-identical raw txs;"
+                f" build {per_tx(web3_build)} -> {per_tx(encoder_build)},"
+                f" build+sign {per_tx(web3_build + web3_sign)}"
+                f" -> {per_tx(encoder_build + encoder_sign)} per tx"
+            )
+
+
+if __name__ == "__main__":
+    main()
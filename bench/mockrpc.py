@@ -0,0 +1,94 @@
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import eth_hash.auto
+import rlp
+from eth_account import Account
+
+
+class MockNode:
+    # just enough of an observer chain node for the send path: it accepts any raw tx
+    # (and never mines it), answers the pre-flight reads with fixed values and sleeps for
+    # latency seconds on every HTTP request, single call or batch, to stand in for the RTT
+    CHAIN_ID = 1287
+
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.block = 100
+        # sender -> next nonce, as eth_getTransactionCount(pending) reports it
+        self.nonces = collections.Counter()
+        self.http_requests = 0
+        self.calls = collections.Counter()
+
+    def reset_counts(self):
+        with self.lock:
+            self.http_requests = 0
+            self.calls.clear()
+
+    def call(self, method, params):
+        with self.lock:
+            self.calls[method] += 1
+            match method:
+                case "eth_chainId":
+                    return hex(MockNode.CHAIN_ID)
+                case "eth_blockNumber":
+                    return hex(self.block)
+                case "eth_gasPrice":
+                    return hex(10**9)
+                case "eth_getBalance":
+                    return hex(10**21)
+                case "eth_getTransactionCount":
+                    return hex(self.nonces[params[0].lower()])
+                case "eth_call":
+                    return "0x"
+                case "eth_sendRawTransaction":
+                    raw = bytes.fromhex(params[0][2:])
+                    sender = Account.recover_transaction(raw).lower()
+                    # type-2 txs are 0x02 || rlp([chainId, nonce, ...])
+                    nonce = (
+                        rlp.decode(raw[1:])[1] if raw[0] == 2 else rlp.decode(raw)[0]
+                    )
+                    nonce = int.from_bytes(nonce, "big")
+                    self.nonces[sender] = max(self.nonces[sender], nonce + 1)
+                    return "0x" + eth_hash.auto.keccak(raw).hex()
+        raise LookupError(method)
+
+    def handle(self, request):
+        try:
+            result = self.call(request["method"], request.get("params", []))
+        except LookupError:
+            error = {"code": -32601, "message": f"method not found {request['method']}"}
+            return {"jsonrpc": "2.0", "id": request["id"], "error": error}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+    def serve(self):
+        # starts serving on a free local port, returns the endpoint URI
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with node.lock:
+                    node.http_requests += 1
+                time.sleep(node.latency)
+                if isinstance(body, list):
+                    response = [node.handle(request) for request in body]
+                else:
+                    response = node.handle(body)
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{server.server_address[1]}"
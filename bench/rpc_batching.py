@@ -0,0 +1,116 @@
+import argparse
+import collections
+import logging
+import os
+import pathlib
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT / "src"))
+os.environ.setdefault("GAS_LIMIT", "300000")
+
+from eth_account import Account  # noqa: E402
+from web3 import Web3  # noqa: E402
+
+from balanceledger import BalanceLedger  # noqa: E402
+from contract import ProofChainContract  # noqa: E402
+from finalizeraccount import FinalizerAccount  # noqa: E402
+from gasoracle import GasOracle  # noqa: E402
+from mockrpc import MockNode  # noqa: E402
+from nonceallocator import NonceAllocator  # noqa: E402
+from rpcpool import RPCEndpointPool  # noqa: E402
+
+# Sends the same finalizations to a local mock node, first the way the finalizer used to
+# (eth_gasPrice, eth_chainId through buildTransaction, eth_getBalance and
+# eth_sendRawTransaction, one session at a time), then through
+# ProofChainContract.send_specimen_finalizations in lane-sized batches, and prints the
+# wall time and HTTP requests of each. Receipts are not waited for by either.
+#
+#   python3 bench/rpc_batching.py --sessions 200 --latency 0.05
+
+Session = collections.namedtuple("Session", ["chainId", "blockHeight"])
+BSP_ADDRESS = Web3.toChecksumAddress("0x" + "ab" * 20)
+BRP_ADDRESS = Web3.toChecksumAddress("0x" + "cd" * 20)
+
+
+def serial(uri, key, sessions):
+    w3 = Web3(Web3.HTTPProvider(uri))
+    with (ROOT / "abi" / "BlockSpecimenProofChainContractABI").open("r") as f:
+        contract = w3.eth.contract(address=BSP_ADDRESS, abi=f.read())
+    nonce = w3.eth.get_transaction_count(key.address, "pending")
+    for session in sessions:
+        transaction = contract.functions.finalizeAndRewardSpecimenSession(
+            session.chainId, session.blockHeight
+        ).buildTransaction(
+            {
+                "gas": int(os.getenv("GAS_LIMIT")),
+                "gasPrice": w3.eth.gasPrice,
+                "from": key.address,
+                "nonce": nonce,
+            }
+        )
+        signed_txn = w3.eth.account.signTransaction(transaction, private_key=key.key)
+        w3.eth.get_balance(key.address)
+        w3.eth.sendRawTransaction(signed_txn.rawTransaction)
+        nonce += 1
+
+
+def batched(uri, key, sessions, batch_size):
+    account = FinalizerAccount(
+        key.address,
+        key.key,
+        NonceAllocator(len(sessions)),
+        BalanceLedger(key.address),
+    )
+    contract = ProofChainContract(
+        RPCEndpointPool([uri]),
+        [account],
+        BSP_ADDRESS,
+        BRP_ADDRESS,
+        GasOracle(),
+        simulate=False,
+    )
+    sent = []
+    pending = sessions
+    while pending:
+        batch, pending = pending[:batch_size], pending[batch_size:]
+        contract.send_specimen_finalizations(batch, on_sent=sent.append)
+    if len(sent) != len(sessions):
+        raise RuntimeError(f"only {len(sent)} of {len(sessions)} sessions were sent")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    node = MockNode(latency=args.latency)
+    uri = node.serve()
+    sessions = [Session(1, height) for height in range(args.sessions)]
+    for name, send in (
+        ("serial", lambda: serial(uri, Account.from_key(b"\x01" * 32), sessions)),
+        (
+            "batched",
+            lambda: batched(
+                uri, Account.from_key(b"\x02" * 32), sessions, args.batch_size
+            ),
+        ),
+    ):
+        node.reset_counts()
+        started = time.monotonic()
+        send()
+        elapsed = time.monotonic() - started
+        print(
+            f"{name}: {len(sessions)} sessions in {elapsed:.2f}s"
+            f" ({elapsed / len(sessions) * 1000:.1f}ms/session),"
+            f" {node.http_requests} HTTP requests,"
+            f" {node.calls['eth_sendRawTransaction']} txs"
+        )
+
+
+if __name__ == "__main__":
+    main()
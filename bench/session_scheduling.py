@@ -0,0 +1,95 @@
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).parent.parent.resolve()
+sys.path.insert(0, str(ROOT / "src"))
+
+from finalizationspecimenrequest import FinalizationSpecimenRequest  # noqa: E402
+from sessionregistry import SessionRegistry  # noqa: E402
+
+# Fills the specimen registry with open sessions whose deadlines fall due --ready at a
+# time, one observer block after another, then per block compares how long it takes to
+# find the due sessions by flattening every open session and comparing deadlines (what
+# the finalizer used to do) with popping them off the registry's deadline heaps, and how
+# long a pop takes when nothing is due. Popped sessions are marked finalized, as the
+# finalizer would.
+#
+#   python3 bench/session_scheduling.py --sessions 1000000 --ready 50
+
+HEAD = 1000
+
+
+def fill(sessions, ready, chains):
+    for i in range(sessions):
+        FinalizationSpecimenRequest(
+            chainId=i % chains,
+            blockHeight=i // chains,
+            deadline=HEAD + i // ready,
+            block_id=i,
+        ).finalize_later()
+
+
+def flattened_scan(height):
+    registry = FinalizationSpecimenRequest.registry
+    to_be_finalized = registry.sessions[SessionRegistry.TO_BE_FINALIZED]
+    return [
+        fr
+        for reqs_for_chain in to_be_finalized.values()
+        for fr in reqs_for_chain.values()
+        if fr.deadline < height
+    ]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000000)
+    parser.add_argument("--ready", type=int, default=50)
+    parser.add_argument("--chains", type=int, default=8)
+    parser.add_argument("--blocks", type=int, default=20)
+    args = parser.parse_args()
+
+    _, filled = timed(fill, args.sessions, args.ready, args.chains)
+    print(f"{args.sessions} open sessions over {args.chains} chains in {filled:.1f}s")
+
+    scans, pops, idle_pops = [], [], []
+    for height in range(HEAD + 1, HEAD + 1 + args.blocks):
+        scanned, scan = timed(flattened_scan, height)
+        popped, pop = timed(
+            FinalizationSpecimenRequest.pop_requests_ready_to_be_finalized, height
+        )
+        if len(popped) != len(scanned):
+            raise SystemExit(
+                f"height {height}: scan found {len(scanned)}, pop {len(popped)}"
+            )
+        for fr in popped:
+            fr.mark_finalized()
+        idle, idle_pop = timed(
+            FinalizationSpecimenRequest.pop_requests_ready_to_be_finalized, height
+        )
+        if idle:
+            raise SystemExit(f"height {height}: {len(idle)} sessions popped twice")
+        scans.append(scan)
+        pops.append(pop)
+        idle_pops.append(idle_pop)
+
+    def median(samples):
+        return f"{statistics.median(samples) * 1000:.3f}ms"
+
+    print(
+        f"{args.ready} due per block, median of {args.blocks} blocks:"
+        f" flattening scan {median(scans)}, heap pop {median(pops)},"
+        f" nothing due {median(idle_pops)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+-- Index support for the _proof_chain_* views and _proof_chain_*_sessions refresh functions.
+-- Proof-chain events are selected by contract (sender) and event signature (topics[1])
+-- within a block_id range, so one partial expression index per contract covers every CTE.
+-- CONCURRENTLY cannot run inside a transaction block; apply with plain psql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS block_log_events_proof_chain_specimen_idx
+  ON chain_moonbeam_moonbase_alpha.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS block_log_events_proof_chain_result_idx
+  ON chain_moonbeam_moonbase_alpha.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea;
+-- partial indexes carry no statistics for topics[1]; without these the planner assumes a
+-- handful of finalization events and picks nested loops over the whole LEFT JOIN (PG14+)
+CREATE STATISTICS IF NOT EXISTS block_log_events_topics_1_stats
+  ON (topics[1]) FROM chain_moonbeam_moonbase_alpha.block_log_events;
+ANALYZE chain_moonbeam_moonbase_alpha.block_log_events;
@@ -0,0 +1,29 @@
+-- Wakes the finalizer's DB managers (DB_LISTEN_CHANNEL=proof_chain_events) as soon as
+-- proof-chain contract logs land, instead of waiting for the next 10s poll.
+-- The notification is only a hint: the managers still run their regular delta query,
+-- so events whose block_transactions rows arrive in a later statement are picked up
+-- by the next notification or by the polling fallback.
+CREATE OR REPLACE FUNCTION chain_moonbeam_moonbase_alpha._proof_chain_notify() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+  max_block_id bigint;
+BEGIN
+  SELECT max(ev.block_id) INTO max_block_id
+  FROM new_events ev
+  WHERE ev.sender IN (
+    '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea,
+    '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea
+  );
+  IF max_block_id IS NOT NULL THEN
+    PERFORM pg_notify('proof_chain_events', max_block_id::text);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS _proof_chain_notify ON chain_moonbeam_moonbase_alpha.block_log_events;
+CREATE TRIGGER _proof_chain_notify
+AFTER INSERT ON chain_moonbeam_moonbase_alpha.block_log_events
+REFERENCING NEW TABLE AS new_events
+FOR EACH STATEMENT
+EXECUTE FUNCTION chain_moonbeam_moonbase_alpha._proof_chain_notify();
@@ -0,0 +1,131 @@
+-- Incrementally maintained replacement for the chain_moonbeam_moonbase_alpha._proof_chain_result_events view.
+-- Columns match the view, so the finalizer can read either (PROOF_CHAIN_SOURCE=table).
+-- chain_moonbeam_moonbase_alpha._proof_chain_result_sessions_refresh() only reads block_log_events past the last refreshed
+-- block_id, so it is cheap to call often. Run it on the primary every few seconds, e.g. with pg_cron:
+--   SELECT cron.schedule('_proof_chain_result_sessions', '5 seconds', 'SELECT chain_moonbeam_moonbase_alpha._proof_chain_result_sessions_refresh()');
+-- The first call backfills the whole history.
+CREATE TABLE IF NOT EXISTS chain_moonbeam_moonbase_alpha._proof_chain_result_sessions (
+  observer_chain_session_start_tx_hash bytea NOT NULL,
+  observer_chain_session_start_block_id bigint NOT NULL,
+  observer_chain_session_start_tx_offset bigint NOT NULL,
+  origin_chain_id numeric NOT NULL,
+  origin_chain_block_height numeric NOT NULL,
+  result_session_deadline numeric,
+  observer_chain_finalization_tx_hash bytea,
+  observer_chain_finalization_block_id bigint,
+  PRIMARY KEY (origin_chain_id, origin_chain_block_height)
+);
+
+CREATE INDEX IF NOT EXISTS _proof_chain_result_sessions_open_idx
+  ON chain_moonbeam_moonbase_alpha._proof_chain_result_sessions ((observer_chain_finalization_tx_hash IS NULL), observer_chain_session_start_block_id);
+CREATE INDEX IF NOT EXISTS _proof_chain_result_sessions_start_idx
+  ON chain_moonbeam_moonbase_alpha._proof_chain_result_sessions (observer_chain_session_start_block_id);
+CREATE INDEX IF NOT EXISTS _proof_chain_result_sessions_finalization_idx
+  ON chain_moonbeam_moonbase_alpha._proof_chain_result_sessions (observer_chain_finalization_block_id)
+  WHERE observer_chain_finalization_block_id IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS chain_moonbeam_moonbase_alpha._proof_chain_refresh_state (
+  relation text PRIMARY KEY,
+  last_block_id bigint NOT NULL
+);
+INSERT INTO chain_moonbeam_moonbase_alpha._proof_chain_refresh_state (relation, last_block_id)
+VALUES ('_proof_chain_result_sessions', '1965606530391765400'::bigint)
+ON CONFLICT (relation) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION chain_moonbeam_moonbase_alpha._proof_chain_result_sessions_refresh() RETURNS bigint
+LANGUAGE plpgsql AS $$
+DECLARE
+  lo bigint;
+  hi bigint;
+  changed bigint;
+  total bigint := 0;
+BEGIN
+  SELECT last_block_id INTO lo
+  FROM chain_moonbeam_moonbase_alpha._proof_chain_refresh_state
+  WHERE relation = '_proof_chain_result_sessions'
+  FOR UPDATE;
+
+  -- only consider blocks whose transactions are already indexed, otherwise the
+  -- successful-transaction join below would silently drop their events
+  SELECT max(block_id) INTO hi
+  FROM chain_moonbeam_moonbase_alpha.block_transactions
+  WHERE block_id > lo;
+  IF hi IS NULL THEN
+    RETURN lo;
+  END IF;
+
+  INSERT INTO chain_moonbeam_moonbase_alpha._proof_chain_result_sessions
+  SELECT
+    session_started.tx_hash,
+    session_started.block_id,
+    session_started.tx_offset,
+    session_started.topics[2]::numeric,
+    session_started.topics[3]::numeric,
+    abi_field(session_started.data, 0)::numeric,
+    NULL,
+    NULL
+  FROM chain_moonbeam_moonbase_alpha.block_log_events session_started
+  JOIN chain_moonbeam_moonbase_alpha.block_transactions trx
+    ON (trx.block_id = session_started.block_id AND trx.tx_offset = session_started.tx_offset)
+  WHERE
+    session_started.sender = '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea
+    AND session_started.topics[1] = '\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea
+    AND trx.successful = TRUE
+    AND session_started.block_id > lo
+    AND session_started.block_id <= hi
+    AND session_started.topics[3]::numeric > 18781735::numeric
+  ON CONFLICT (origin_chain_id, origin_chain_block_height) DO NOTHING;
+  GET DIAGNOSTICS changed = ROW_COUNT;
+  total := total + changed;
+
+  UPDATE chain_moonbeam_moonbase_alpha._proof_chain_result_sessions s
+  SET
+    observer_chain_finalization_tx_hash = afe.tx_hash,
+    observer_chain_finalization_block_id = afe.block_id
+  FROM (
+    SELECT fin.tx_hash, fin.block_id,
+      fin.topics[2]::numeric AS origin_chain_id,
+      fin.topics[3]::numeric AS origin_chain_block_height
+    FROM chain_moonbeam_moonbase_alpha.block_log_events fin
+    JOIN chain_moonbeam_moonbase_alpha.block_transactions trx_1
+      ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+    WHERE
+      fin.sender = '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea
+      AND fin.topics[1] = '\x93dcf9329a330cb95723152c05719560f2fbd50e215c542854b27acc80c9108d'::bytea
+      AND trx_1.successful = TRUE
+      AND fin.block_id > lo
+      AND fin.block_id <= hi
+    UNION ALL
+    SELECT fin.tx_hash, fin.block_id,
+      fin.topics[2]::numeric AS origin_chain_id,
+      public.abi_field(fin.data, 0)::numeric AS origin_chain_block_height
+    FROM chain_moonbeam_moonbase_alpha.block_log_events fin
+    JOIN chain_moonbeam_moonbase_alpha.block_transactions trx_1
+      ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+    WHERE
+      fin.sender = '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea
+      AND fin.topics[1] = '\x31d16d882c6405d327fa305ecf0d52b45154868e0828822533fd2547f4b21a75'::bytea
+      AND trx_1.successful = TRUE
+      AND fin.block_id > lo
+      AND fin.block_id <= hi
+  ) afe
+  WHERE
+    s.origin_chain_id = afe.origin_chain_id
+    AND s.origin_chain_block_height = afe.origin_chain_block_height
+    AND s.observer_chain_finalization_tx_hash IS NULL;
+  GET DIAGNOSTICS changed = ROW_COUNT;
+  total := total + changed;
+
+  UPDATE chain_moonbeam_moonbase_alpha._proof_chain_refresh_state
+  SET last_block_id = hi
+  WHERE relation = '_proof_chain_result_sessions';
+
+  -- NOTIFY is not replicated, so this only reaches finalizers connected to the primary
+  IF total > 0 THEN
+    PERFORM pg_notify('proof_chain_events', hi::text);
+  END IF;
+  RETURN hi;
+END;
+$$;
+
+SELECT chain_moonbeam_moonbase_alpha._proof_chain_result_sessions_refresh();
@@ -0,0 +1,46 @@
+-- EXPLAIN ANALYZE comparison of the finalizer's queries against the
+-- _proof_chain_* views and the maintained _proof_chain_*_sessions tables.
+-- Usage: psql -v block_id=<BLOCK_ID_START> -v finalization_block_id=<block_id> -f sql/proof_chain_mbase_sessions_explain.sql
+\if :{?block_id}
+\else
+  \set block_id 2025156010573169636
+\endif
+\if :{?finalization_block_id}
+\else
+  \set finalization_block_id 2025156010573169636
+\endif
+\echo specimen initial catch-up scan: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL AND origin_chain_block_height > 18781665;
+
+\echo specimen initial catch-up scan: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL AND origin_chain_block_height > 18781665;
+
+\echo specimen incremental session-start delta: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > :block_id AND origin_chain_block_height > 18781665;
+
+\echo specimen incremental session-start delta: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions" WHERE observer_chain_session_start_block_id > :block_id AND origin_chain_block_height > 18781665;
+
+\echo specimen incremental finalization delta: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_finalization_block_id > :finalization_block_id AND origin_chain_block_height > 18781665;
+
+\echo specimen incremental finalization delta: chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_sessions" WHERE observer_chain_finalization_block_id > :finalization_block_id AND origin_chain_block_height > 18781665;
+
+\echo result initial catch-up scan: chain_moonbeam_moonbase_alpha."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_events" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL AND origin_chain_block_height > 18781735;
+
+\echo result initial catch-up scan: chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL AND origin_chain_block_height > 18781735;
+
+\echo result incremental session-start delta: chain_moonbeam_moonbase_alpha."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_events" WHERE observer_chain_session_start_block_id > :block_id AND origin_chain_block_height > 18781735;
+
+\echo result incremental session-start delta: chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions" WHERE observer_chain_session_start_block_id > :block_id AND origin_chain_block_height > 18781735;
+
+\echo result incremental finalization delta: chain_moonbeam_moonbase_alpha."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_events" WHERE observer_chain_finalization_block_id > :finalization_block_id AND origin_chain_block_height > 18781735;
+
+\echo result incremental finalization delta: chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_result_sessions" WHERE observer_chain_finalization_block_id > :finalization_block_id AND origin_chain_block_height > 18781735;
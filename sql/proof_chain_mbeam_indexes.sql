@@ -0,0 +1,15 @@
+-- Index support for the _proof_chain_* views and _proof_chain_*_sessions refresh functions.
+-- Proof-chain events are selected by contract (sender) and event signature (topics[1])
+-- within a block_id range, so one partial expression index per contract covers every CTE.
+-- CONCURRENTLY cannot run inside a transaction block; apply with plain psql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS block_log_events_proof_chain_specimen_idx
+  ON chain_moonbeam_mainnet.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x4f2e285227d43d9eb52799d0a28299540452446e'::bytea;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS block_log_events_proof_chain_result_idx
+  ON chain_moonbeam_mainnet.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x254E3FA072324fa202577F24147066359947bC23'::bytea;
+-- partial indexes carry no statistics for topics[1]; without these the planner assumes a
+-- handful of finalization events and picks nested loops over the whole LEFT JOIN (PG14+)
+CREATE STATISTICS IF NOT EXISTS block_log_events_topics_1_stats
+  ON (topics[1]) FROM chain_moonbeam_mainnet.block_log_events;
+ANALYZE chain_moonbeam_mainnet.block_log_events;
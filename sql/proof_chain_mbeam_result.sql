@@ -12,33 +12,31 @@ session_started_events AS (
     ON (trx.block_id = session_started.block_id AND trx.tx_offset = session_started.tx_offset)
   WHERE
     session_started.sender = '\x254E3FA072324fa202577F24147066359947bC23'::bytea
-    AND session_started.topics @> ARRAY[
-      '\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea
-    ]
+    AND session_started.topics[1] = '\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea
     AND trx.successful = TRUE
     AND session_started.block_id >= '1928585162635558598'::bigint
-  ORDER BY session_started.block_id ASC, session_started.log_offset ASC
+    AND session_started.topics[3]::numeric > 17919120::numeric
 ),
 result_reward_awarded_events AS (
   SELECT
     fin.tx_hash AS observer_chain_tx_hash,
-    fin.topics[2]::numeric AS origin_chain_id, 
+    fin.block_id AS observer_chain_block_id,
+    fin.topics[2]::numeric AS origin_chain_id,
     fin.topics[3]::numeric AS origin_chain_block_height
   FROM chain_moonbeam_mainnet.block_log_events fin
   JOIN chain_moonbeam_mainnet.block_transactions trx_1
     ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
   WHERE
     fin.sender = '\x254E3FA072324fa202577F24147066359947bC23'::bytea
-    AND fin.topics @> ARRAY[
-      '\x93dcf9329a330cb95723152c05719560f2fbd50e215c542854b27acc80c9108d'::bytea
-    ]
+    AND fin.topics[1] = '\x93dcf9329a330cb95723152c05719560f2fbd50e215c542854b27acc80c9108d'::bytea
     AND trx_1.successful = TRUE
     AND fin.block_id >= '1928585162635558598'::bigint
-  ORDER BY fin.block_id ASC, fin.log_offset ASC
+    AND fin.topics[3]::numeric > 17919120::numeric
 ),
 result_quorum_not_reached_events AS (
   SELECT
     fin.tx_hash AS observer_chain_tx_hash,
+    fin.block_id AS observer_chain_block_id,
     fin.topics[2]::numeric AS origin_chain_id,
     public.abi_field(fin.data, 0)::numeric AS origin_chain_block_height
   FROM chain_moonbeam_mainnet.block_log_events fin
@@ -46,10 +44,10 @@ result_quorum_not_reached_events AS (
     ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
   WHERE
     fin.sender = '\x254E3FA072324fa202577F24147066359947bC23'::bytea
-    AND fin.topics @> ARRAY['\x398fd8f638a7242217f011fd0720a06747f7a85b7d28d7276684b841baea4021'::bytea]
+    AND fin.topics[1] = '\x398fd8f638a7242217f011fd0720a06747f7a85b7d28d7276684b841baea4021'::bytea
     AND trx_1.successful = TRUE
     AND fin.block_id >= '1928585162635558598'::bigint
-  ORDER BY fin.block_id ASC, fin.log_offset ASC
+    AND public.abi_field(fin.data, 0)::numeric > 17919120::numeric
 ),
 all_finalization_events AS (
   SELECT * FROM result_reward_awarded_events
@@ -63,12 +61,12 @@ SELECT
   sse.origin_chain_id,
   sse.origin_chain_block_height,
   sse.result_session_deadline,
-  afe.observer_chain_tx_hash AS observer_chain_finalization_tx_hash
+  afe.observer_chain_tx_hash AS observer_chain_finalization_tx_hash,
+  afe.observer_chain_block_id AS observer_chain_finalization_block_id
 FROM session_started_events sse
 LEFT JOIN all_finalization_events afe ON (
   sse.origin_chain_id = afe.origin_chain_id
   AND sse.origin_chain_block_height = afe.origin_chain_block_height
 )
-WHERE sse.origin_chain_block_height > 17919120::numeric
 ORDER BY sse.observer_chain_block_id ASC, sse.observer_chain_tx_offset ASC
 ;
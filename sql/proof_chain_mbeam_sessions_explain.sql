@@ -0,0 +1,46 @@
+-- EXPLAIN ANALYZE comparison of the finalizer's queries against the
+-- _proof_chain_* views and the maintained _proof_chain_*_sessions tables.
+-- Usage: psql -v block_id=<BLOCK_ID_START> -v finalization_block_id=<block_id> -f sql/proof_chain_mbeam_sessions_explain.sql
+\if :{?block_id}
+\else
+  \set block_id 1928585162635558598
+\endif
+\if :{?finalization_block_id}
+\else
+  \set finalization_block_id 1928585162635558598
+\endif
+\echo specimen initial catch-up scan: chain_moonbeam_mainnet."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL;
+
+\echo specimen initial catch-up scan: chain_moonbeam_mainnet."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_sessions" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL;
+
+\echo specimen incremental session-start delta: chain_moonbeam_mainnet."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > :block_id;
+
+\echo specimen incremental session-start delta: chain_moonbeam_mainnet."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_sessions" WHERE observer_chain_session_start_block_id > :block_id;
+
+\echo specimen incremental finalization delta: chain_moonbeam_mainnet."_proof_chain_specimen_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_events" WHERE observer_chain_finalization_block_id > :finalization_block_id;
+
+\echo specimen incremental finalization delta: chain_moonbeam_mainnet."_proof_chain_specimen_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_specimen_sessions" WHERE observer_chain_finalization_block_id > :finalization_block_id;
+
+\echo result initial catch-up scan: chain_moonbeam_mainnet."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_events" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL;
+
+\echo result initial catch-up scan: chain_moonbeam_mainnet."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_sessions" WHERE observer_chain_session_start_block_id > :block_id AND observer_chain_finalization_tx_hash IS NULL;
+
+\echo result incremental session-start delta: chain_moonbeam_mainnet."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_events" WHERE observer_chain_session_start_block_id > :block_id;
+
+\echo result incremental session-start delta: chain_moonbeam_mainnet."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_sessions" WHERE observer_chain_session_start_block_id > :block_id;
+
+\echo result incremental finalization delta: chain_moonbeam_mainnet."_proof_chain_result_events"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_events" WHERE observer_chain_finalization_block_id > :finalization_block_id;
+
+\echo result incremental finalization delta: chain_moonbeam_mainnet."_proof_chain_result_sessions"
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM chain_moonbeam_mainnet."_proof_chain_result_sessions" WHERE observer_chain_finalization_block_id > :finalization_block_id;
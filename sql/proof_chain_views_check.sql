@@ -0,0 +1,315 @@
+-- Fixture-based check for the rewritten _proof_chain_* views: loads synthetic proof-chain
+-- events into a scratch schema, verifies the rewritten view returns exactly the rows of the
+-- previous definition, and reports planner cost and execution time of the finalizer's queries
+-- before (previous view, no proof-chain indexes) and after (rewritten view + indexes).
+-- All four views share one shape, so the moonbase specimen view stands in for the others.
+-- Run against a local scratch database, never a production one:
+--   createdb proof_chain_check
+--   psql -v ON_ERROR_STOP=1 -d proof_chain_check -f sql/proof_chain_views_check.sql
+-- Stand-ins for the bytea->numeric cast and abi_field() are created when missing.
+\set QUIET on
+DROP SCHEMA IF EXISTS proof_chain_fixture CASCADE;
+CREATE SCHEMA proof_chain_fixture;
+SET search_path = proof_chain_fixture, public;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_cast
+    WHERE castsource = 'bytea'::regtype AND casttarget = 'numeric'::regtype
+  ) THEN
+    -- only the low 63 bits, which is all the fixture data uses
+    CREATE FUNCTION public.bytea_to_numeric(b bytea) RETURNS numeric
+    LANGUAGE sql IMMUTABLE STRICT AS $f$
+      SELECT ('x' || lpad(right(encode(b, 'hex'), 16), 16, '0'))::bit(64)::bigint::numeric
+    $f$;
+    CREATE CAST (bytea AS numeric) WITH FUNCTION public.bytea_to_numeric(bytea);
+  END IF;
+  IF to_regprocedure('public.abi_field(bytea, integer)') IS NULL THEN
+    CREATE FUNCTION public.abi_field(data bytea, idx integer) RETURNS bytea
+    LANGUAGE sql IMMUTABLE STRICT AS $f$ SELECT substring(data FROM idx * 32 + 1 FOR 32) $f$;
+  END IF;
+END;
+$$;
+
+CREATE FUNCTION pg_temp.word(x bigint) RETURNS bytea
+LANGUAGE sql IMMUTABLE AS $$ SELECT decode(lpad(to_hex(x), 64, '0'), 'hex') $$;
+
+CREATE TABLE block_transactions (
+  block_id bigint NOT NULL,
+  tx_offset integer NOT NULL,
+  successful boolean NOT NULL,
+  PRIMARY KEY (block_id, tx_offset)
+);
+CREATE TABLE block_log_events (
+  block_id bigint NOT NULL,
+  tx_offset integer NOT NULL,
+  log_offset integer NOT NULL,
+  tx_hash bytea NOT NULL,
+  sender bytea NOT NULL,
+  topics bytea[] NOT NULL,
+  data bytea
+);
+CREATE INDEX ON block_log_events (block_id);
+
+-- session i starts at block first + 10i; some fall below the block_id and height cutoffs,
+-- some come from another contract or a failed transaction, 60% are rewarded, 10% miss quorum
+-- (some of those finalizations failed) and the rest are still open
+INSERT INTO block_transactions
+SELECT 2025156010573119636 + i * 10, 0, i % 20 <> 0 FROM generate_series(1, 200000) i
+UNION ALL
+SELECT 2025156010573119636 + i * 10 + 5, 0, i % 50 <> 1 FROM generate_series(1, 200000) i WHERE i % 10 < 7;
+
+INSERT INTO block_log_events
+SELECT
+  2025156010573119636 + i * 10, 0, 0,
+  sha256(('start' || i)::bytea),
+  CASE WHEN i % 17 = 0 THEN '\x0000000000000000000000000000000000000000'::bytea ELSE '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea END,
+  ARRAY['\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea, pg_temp.word(CASE WHEN i % 3 = 0 THEN 137 ELSE 1 END), pg_temp.word(18781665 - 1000 + i)],
+  pg_temp.word(18781665 - 1000 + i + 100)
+FROM generate_series(1, 200000) i
+UNION ALL
+SELECT
+  2025156010573119636 + i * 10 + 5, 0, 0,
+  sha256(('reward' || i)::bytea),
+  '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea,
+  ARRAY['\xf05ac779af1ec75a7b2fbe9415b33a67c00294a121786f7ce2eb3f92e4a6424a'::bytea, pg_temp.word(CASE WHEN i % 3 = 0 THEN 137 ELSE 1 END), pg_temp.word(18781665 - 1000 + i)],
+  NULL
+FROM generate_series(1, 200000) i WHERE i % 10 < 6
+UNION ALL
+SELECT
+  2025156010573119636 + i * 10 + 5, 0, 0,
+  sha256(('quorum' || i)::bytea),
+  '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea,
+  ARRAY['\x8340aa7a5b37153230f8b64fa66f25c843e5002c60e63a25db6a9195005ccabd'::bytea, pg_temp.word(CASE WHEN i % 3 = 0 THEN 137 ELSE 1 END)],
+  pg_temp.word(18781665 - 1000 + i)
+FROM generate_series(1, 200000) i WHERE i % 10 = 6;
+
+CREATE OR REPLACE VIEW proof_chain_fixture._proof_chain_specimen_events_legacy AS
+WITH
+session_started_events AS (
+  SELECT session_started.tx_hash AS observer_chain_tx_hash,
+    session_started.block_id AS observer_chain_block_id,
+    session_started.tx_offset AS observer_chain_tx_offset,
+    session_started.topics[2]::numeric AS origin_chain_id,
+    session_started.topics[3]::numeric AS origin_chain_block_height,
+    abi_field(session_started.data, 0)::numeric AS proof_session_deadline
+  FROM proof_chain_fixture.block_log_events session_started
+  JOIN proof_chain_fixture.block_transactions trx
+    ON (trx.block_id = session_started.block_id AND trx.tx_offset = session_started.tx_offset)
+  WHERE
+    session_started.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND session_started.topics @> ARRAY[
+      '\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea
+    ]
+    AND trx.successful = TRUE
+    AND session_started.block_id >= '2025156010573169636'::bigint
+  ORDER BY session_started.block_id ASC, session_started.log_offset ASC
+),
+specimen_reward_awarded_events AS (
+  SELECT
+    fin.tx_hash AS observer_chain_tx_hash,
+    fin.block_id AS observer_chain_block_id,
+    fin.topics[2]::numeric AS origin_chain_id,
+    fin.topics[3]::numeric AS origin_chain_block_height
+  FROM proof_chain_fixture.block_log_events fin
+  JOIN proof_chain_fixture.block_transactions trx_1
+    ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+  WHERE
+    fin.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND fin.topics @> ARRAY['\xf05ac779af1ec75a7b2fbe9415b33a67c00294a121786f7ce2eb3f92e4a6424a'::bytea]
+    AND trx_1.successful = TRUE
+    AND fin.block_id >= '2025156010573169636'::bigint
+  ORDER BY fin.block_id ASC, fin.log_offset ASC
+),
+specimen_quorum_not_reached_events AS (
+  SELECT
+    fin.tx_hash AS observer_chain_tx_hash,
+    fin.block_id AS observer_chain_block_id,
+    fin.topics[2]::numeric AS origin_chain_id,
+    public.abi_field(fin.data, 0)::numeric AS origin_chain_block_height
+  FROM proof_chain_fixture.block_log_events fin
+  JOIN proof_chain_fixture.block_transactions trx_1
+    ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+  WHERE
+    fin.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND fin.topics @> ARRAY['\x8340aa7a5b37153230f8b64fa66f25c843e5002c60e63a25db6a9195005ccabd'::bytea]
+    AND trx_1.successful = TRUE
+    AND fin.block_id >= '2025156010573169636'::bigint
+  ORDER BY fin.block_id ASC, fin.log_offset ASC
+),
+all_finalization_events AS (
+  SELECT * FROM specimen_reward_awarded_events
+  UNION ALL
+  SELECT * FROM specimen_quorum_not_reached_events
+)
+SELECT
+  sse.observer_chain_tx_hash AS observer_chain_session_start_tx_hash,
+  sse.observer_chain_block_id AS observer_chain_session_start_block_id,
+  sse.observer_chain_tx_offset AS observer_chain_session_start_tx_offset,
+  sse.origin_chain_id,
+  sse.origin_chain_block_height,
+  sse.proof_session_deadline,
+  afe.observer_chain_tx_hash AS observer_chain_finalization_tx_hash,
+  afe.observer_chain_block_id AS observer_chain_finalization_block_id
+FROM session_started_events sse
+LEFT JOIN all_finalization_events afe ON (
+  sse.origin_chain_id = afe.origin_chain_id
+  AND sse.origin_chain_block_height = afe.origin_chain_block_height
+)
+WHERE sse.origin_chain_block_height > 18781665::numeric
+ORDER BY sse.observer_chain_block_id ASC, sse.observer_chain_tx_offset ASC
+;
+
+CREATE OR REPLACE VIEW proof_chain_fixture._proof_chain_specimen_events AS
+WITH
+session_started_events AS (
+  SELECT session_started.tx_hash AS observer_chain_tx_hash,
+    session_started.block_id AS observer_chain_block_id,
+    session_started.tx_offset AS observer_chain_tx_offset,
+    session_started.topics[2]::numeric AS origin_chain_id,
+    session_started.topics[3]::numeric AS origin_chain_block_height,
+    abi_field(session_started.data, 0)::numeric AS proof_session_deadline
+  FROM proof_chain_fixture.block_log_events session_started
+  JOIN proof_chain_fixture.block_transactions trx
+    ON (trx.block_id = session_started.block_id AND trx.tx_offset = session_started.tx_offset)
+  WHERE
+    session_started.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND session_started.topics[1] = '\x8b1f889addbfa41db5227bae3b091bd5c8b9a9122f874dfe54ba2f75aabe1f4c'::bytea
+    AND trx.successful = TRUE
+    AND session_started.block_id >= '2025156010573169636'::bigint
+    AND session_started.topics[3]::numeric > 18781665::numeric
+),
+specimen_reward_awarded_events AS (
+  SELECT
+    fin.tx_hash AS observer_chain_tx_hash,
+    fin.block_id AS observer_chain_block_id,
+    fin.topics[2]::numeric AS origin_chain_id,
+    fin.topics[3]::numeric AS origin_chain_block_height
+  FROM proof_chain_fixture.block_log_events fin
+  JOIN proof_chain_fixture.block_transactions trx_1
+    ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+  WHERE
+    fin.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND fin.topics[1] = '\xf05ac779af1ec75a7b2fbe9415b33a67c00294a121786f7ce2eb3f92e4a6424a'::bytea
+    AND trx_1.successful = TRUE
+    AND fin.block_id >= '2025156010573169636'::bigint
+    AND fin.topics[3]::numeric > 18781665::numeric
+),
+specimen_quorum_not_reached_events AS (
+  SELECT
+    fin.tx_hash AS observer_chain_tx_hash,
+    fin.block_id AS observer_chain_block_id,
+    fin.topics[2]::numeric AS origin_chain_id,
+    public.abi_field(fin.data, 0)::numeric AS origin_chain_block_height
+  FROM proof_chain_fixture.block_log_events fin
+  JOIN proof_chain_fixture.block_transactions trx_1
+    ON (trx_1.block_id = fin.block_id AND trx_1.tx_offset = fin.tx_offset)
+  WHERE
+    fin.sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea
+    AND fin.topics[1] = '\x8340aa7a5b37153230f8b64fa66f25c843e5002c60e63a25db6a9195005ccabd'::bytea
+    AND trx_1.successful = TRUE
+    AND fin.block_id >= '2025156010573169636'::bigint
+    AND public.abi_field(fin.data, 0)::numeric > 18781665::numeric
+),
+all_finalization_events AS (
+  SELECT * FROM specimen_reward_awarded_events
+  UNION ALL
+  SELECT * FROM specimen_quorum_not_reached_events
+)
+SELECT
+  sse.observer_chain_tx_hash AS observer_chain_session_start_tx_hash,
+  sse.observer_chain_block_id AS observer_chain_session_start_block_id,
+  sse.observer_chain_tx_offset AS observer_chain_session_start_tx_offset,
+  sse.origin_chain_id,
+  sse.origin_chain_block_height,
+  sse.proof_session_deadline,
+  afe.observer_chain_tx_hash AS observer_chain_finalization_tx_hash,
+  afe.observer_chain_block_id AS observer_chain_finalization_block_id
+FROM session_started_events sse
+LEFT JOIN all_finalization_events afe ON (
+  sse.origin_chain_id = afe.origin_chain_id
+  AND sse.origin_chain_block_height = afe.origin_chain_block_height
+)
+ORDER BY sse.observer_chain_block_id ASC, sse.observer_chain_tx_offset ASC
+;
+
+CREATE TEMP TABLE plan_costs (phase text, query text, total_cost numeric, execution_ms numeric);
+CREATE FUNCTION pg_temp.plan_cost(query text) RETURNS TABLE (total_cost numeric, execution_ms numeric)
+LANGUAGE plpgsql AS $$
+DECLARE
+  plan json;
+BEGIN
+  EXECUTE 'EXPLAIN (ANALYZE, FORMAT JSON) ' || query INTO plan;
+  RETURN QUERY SELECT
+    (plan -> 0 -> 'Plan' ->> 'Total Cost')::numeric,
+    (plan -> 0 ->> 'Execution Time')::numeric;
+END;
+$$;
+
+ANALYZE block_transactions, block_log_events;
+INSERT INTO pg_temp.plan_costs SELECT 'before', 'catch-up', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events_legacy WHERE observer_chain_session_start_block_id > 2025156010573169636 AND observer_chain_finalization_tx_hash IS NULL'
+);
+INSERT INTO pg_temp.plan_costs SELECT 'before', 'session delta', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events_legacy WHERE observer_chain_session_start_block_id > 2025156010575118636'
+);
+INSERT INTO pg_temp.plan_costs SELECT 'before', 'finalization delta', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events_legacy WHERE observer_chain_finalization_block_id > 2025156010575118636'
+);
+
+CREATE INDEX IF NOT EXISTS block_log_events_proof_chain_specimen_idx
+  ON proof_chain_fixture.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x30F220B44E937dd6A2A43D91D564E259f3574eb8'::bytea;
+CREATE INDEX IF NOT EXISTS block_log_events_proof_chain_result_idx
+  ON proof_chain_fixture.block_log_events ((topics[1]), block_id)
+  WHERE sender = '\x3f91F5034dACc2961F62dCF744286540C8786710'::bytea;
+CREATE STATISTICS IF NOT EXISTS block_log_events_topics_1_stats
+  ON (topics[1]) FROM proof_chain_fixture.block_log_events;
+ANALYZE proof_chain_fixture.block_log_events;
+INSERT INTO pg_temp.plan_costs SELECT 'after', 'catch-up', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events WHERE observer_chain_session_start_block_id > 2025156010573169636 AND observer_chain_finalization_tx_hash IS NULL'
+);
+INSERT INTO pg_temp.plan_costs SELECT 'after', 'session delta', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events WHERE observer_chain_session_start_block_id > 2025156010575118636'
+);
+INSERT INTO pg_temp.plan_costs SELECT 'after', 'finalization delta', * FROM pg_temp.plan_cost(
+  'SELECT * FROM proof_chain_fixture._proof_chain_specimen_events WHERE observer_chain_finalization_block_id > 2025156010575118636'
+);
+
+DO $$
+DECLARE
+  total bigint;
+  missing bigint;
+  extra bigint;
+BEGIN
+  SELECT count(*) INTO total FROM proof_chain_fixture._proof_chain_specimen_events_legacy;
+  SELECT count(*) INTO missing FROM (
+    SELECT * FROM proof_chain_fixture._proof_chain_specimen_events_legacy
+    EXCEPT ALL
+    SELECT * FROM proof_chain_fixture._proof_chain_specimen_events
+  ) d;
+  SELECT count(*) INTO extra FROM (
+    SELECT * FROM proof_chain_fixture._proof_chain_specimen_events
+    EXCEPT ALL
+    SELECT * FROM proof_chain_fixture._proof_chain_specimen_events_legacy
+  ) d;
+  IF missing > 0 OR extra > 0 OR total = 0 THEN
+    RAISE EXCEPTION 'rewritten view differs: % rows, % missing, % extra', total, missing, extra;
+  END IF;
+  RAISE NOTICE 'rewritten view returns the same % rows', total;
+END;
+$$;
+
+\set QUIET off
+SELECT
+  b.query,
+  b.total_cost AS cost_before,
+  a.total_cost AS cost_after,
+  b.execution_ms AS ms_before,
+  a.execution_ms AS ms_after
+FROM plan_costs b
+JOIN plan_costs a ON (a.query = b.query AND a.phase = 'after')
+WHERE b.phase = 'before';
+
+DROP SCHEMA proof_chain_fixture CASCADE;
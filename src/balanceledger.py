@@ -0,0 +1,96 @@
+import threading
+import time
+
+import logformat
+
+
+class BalanceLedger:
+    def __init__(self, address, low_balance_threshold=0, refresh_interval=60.0):
+        self.address = address
+        self.low_balance_threshold = low_balance_threshold
+        self.refresh_interval = refresh_interval
+
+        self.logger = logformat.get_logger("Contract")
+        self.cond = threading.Condition()
+        # last balance read from the chain and the block it was read at; receipts from
+        # later blocks are debited locally until the next read
+        self.balance = None
+        self.balance_block = None
+        self.refreshed_at = 0.0
+        # nonce -> the most a tx in flight with that nonce can cost
+        self.reserved = {}
+        self.paused = False
+
+    def requests(self):
+        # the JSON-RPC calls needed to refresh the balance, to be merged into a caller's batch
+        if self.balance is not None:
+            age = time.monotonic() - self.refreshed_at
+            if age < self.refresh_interval:
+                return []
+        return [("eth_getBalance", [self.address, "latest"])]
+
+    def update(self, results, block_number=None):
+        # takes the results of requests(), in order; a no-op when nothing was requested
+        if not results:
+            return
+        if isinstance(results[0], ValueError):
+            raise results[0]
+        with self.cond:
+            self.balance = int(results[0], 16)
+            self.balance_block = block_number
+            self.refreshed_at = time.monotonic()
+            self.cond.notify_all()
+
+    def reserve(self, nonce, max_cost):
+        with self.cond:
+            self.reserved[nonce] = max_cost
+
+    def settle(self, nonce, receipt):
+        # receipt is None when we don't know what the tx with this nonce cost
+        with self.cond:
+            max_cost = self.reserved.pop(nonce, 0)
+            if self.balance is None:
+                return
+            if receipt is None:
+                cost = max_cost
+            elif receipt.effectiveGasPrice is None:
+                # pre-London nodes leave it out; the reservation is the safe upper bound
+                cost = max_cost
+            else:
+                cost = receipt.gasUsed * receipt.effectiveGasPrice
+            # a balance read at or after the tx's block already has its cost taken off
+            ordered = self.balance_block is not None and receipt is not None
+            if not ordered or receipt.blockNumber > self.balance_block:
+                self.balance -= cost
+            self.cond.notify_all()
+
+    def spendable(self):
+        with self.cond:
+            return self.balance - sum(self.reserved.values())
+
+    def stale(self):
+        return bool(self.requests())
+
+    def funded(self):
+        # whether the balance left after everything in flight covers the alarm threshold;
+        # callers hold sends back while it doesn't, instead of letting txs bounce for lack
+        # of funds. Never blocks; an unknown balance counts as funded until it is read
+        with self.cond:
+            if self.balance is None:
+                return True
+            spendable = self.spendable()
+            funded = spendable >= self.low_balance_threshold
+            if not funded and not self.paused:
+                self.paused = True
+                self.logger.error(
+                    f"Sender balance low, pausing finalization"
+                    f" spendable={spendable}wei"
+                    f" threshold={self.low_balance_threshold}wei"
+                )
+            elif funded and self.paused:
+                self.paused = False
+                self.logger.warning(
+                    f"Sender balance recovered, resuming finalization"
+                    f" spendable={spendable}wei"
+                )
+            return funded
@@ -0,0 +1,49 @@
+import json
+
+import eth_hash.auto
+from web3 import Web3
+
+
+class FinalizeCallEncoder:
+    # finalizeAndReward*Session(uint64 chainId, uint64 blockHeight) has fixed-size calldata:
+    # a 4-byte selector followed by two left-padded 32-byte words, so it is assembled
+    # directly instead of going through web3's ABI lookup and argument validation
+    UINT64_MAX = 2**64 - 1
+
+    def __init__(self, abi_path, function_name, contract_address):
+        with abi_path.open("r") as f:
+            abi = json.load(f)
+        entry = next(
+            (
+                e
+                for e in abi
+                if e.get("type") == "function" and e.get("name") == function_name
+            ),
+            None,
+        )
+        if entry is None:
+            raise ValueError(f"{function_name} not found in {abi_path.name}")
+        types = [i["type"] for i in entry["inputs"]]
+        if types != ["uint64", "uint64"]:
+            raise ValueError(f"unexpected inputs for {function_name}: {types}")
+
+        signature = f"{function_name}({','.join(types)})"
+        self.selector = eth_hash.auto.keccak(signature.encode())[:4]
+        self.to = Web3.toChecksumAddress(contract_address)
+
+    def calldata(self, chainId, blockHeight) -> bytes:
+        for arg in (chainId, blockHeight):
+            if not 0 <= arg <= FinalizeCallEncoder.UINT64_MAX:
+                raise ValueError(f"{arg} does not fit in uint64")
+        words = chainId.to_bytes(32, "big") + blockHeight.to_bytes(32, "big")
+        return self.selector + words
+
+    def transaction(self, chainId, blockHeight, fields):
+        # the same dict buildTransaction would produce, given the gas, fee, nonce and
+        # chainId fields (the latter being the observer chain's, not the session's)
+        return {
+            "to": self.to,
+            "value": 0,
+            "data": "0x" + self.calldata(chainId, blockHeight).hex(),
+            **fields,
+        }
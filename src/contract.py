@@ -1,4 +1,10 @@
-import statistics
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import itertools
+import re
+import threading
 import traceback
 import random
 import time
@@ -6,12 +12,20 @@ import os
 import pathlib
 
 from web3 import Web3
-from web3.exceptions import TimeExhausted
 from web3.middleware import geth_poa_middleware
 import web3.auto
+import eth_abi
+from eth_abi.exceptions import DecodingError
 import eth_hash.auto
 import logformat
 
+from finalizeraccount import FinalizerAccount
+from nonceallocator import InFlightTx
+from calldata import FinalizeCallEncoder
+from gasoracle import GasOracle
+from rpcbatch import RPCBatch
+from rpcpool import RPCEndpointPool
+
 MODULE_ROOT_PATH = pathlib.Path(__file__).parent.parent.resolve()
 
 
@@ -19,6 +33,7 @@ class LoggableReceipt:
     def __init__(self, fields, fail_reason=None):
         self.blockNumber = fields["blockNumber"]
         self.gasUsed = fields["gasUsed"]
+        self.effectiveGasPrice = fields.get("effectiveGasPrice")
         self.status = fields["status"]
         self.txHash = fields["transactionHash"].hex()
         self.txIndex = fields["transactionIndex"]
@@ -47,40 +62,59 @@ class LoggableBounce:
 
 
 class ProofChainContract:
+    ROUND_ROBIN = "round-robin"
+    BY_CHAIN = "chain"
+
     def __init__(
         self,
-        rpc_endpoint,
-        finalizer_address,
-        finalizer_prvkey,
+        provider: RPCEndpointPool,
+        accounts: list[FinalizerAccount],
         bsp_proofchain_address,
         brp_proofchain_address,
+        gas_oracle: GasOracle,
+        routing=ROUND_ROBIN,
+        simulate=True,
+        window_wait=15.0,
     ):
-        self.nonce = None
-        self.counter = 0
-        self.finalizer_address = finalizer_address
-        self.finalizer_prvkey = finalizer_prvkey
-        self.provider: Web3.HTTPProvider = Web3.HTTPProvider(rpc_endpoint)
+        if routing not in (ProofChainContract.ROUND_ROBIN, ProofChainContract.BY_CHAIN):
+            raise ValueError(f"unknown finalizer key routing {routing}")
+        self.accounts = accounts
+        self.routing = routing
+        self.round_robin = itertools.count()
+        # sends for different accounts only contend for the RPC, so they run side by side,
+        # as do the specimen and result sends of one account
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2 * len(accounts), thread_name_prefix="sender"
+        )
+        self.gas_oracle = gas_oracle
+        # eth_call every finalization before signing it, to leave out the ones that revert
+        self.simulate = simulate
+        # how long a sender whose window filled up mid-send waits for a receipt to free a
+        # slot before leaving its remaining sessions to the caller
+        self.window_wait = window_wait
+        self.lock = threading.Lock()
+        # (kind, revert reason) -> sessions left out after simulating them
+        self.simulated_reverts = collections.Counter()
+        self.chain_id = None
+        self.latest_block_number = None
+        self.provider = provider
         self.w3: Web3 = Web3(self.provider)
         self.gas = int(os.getenv("GAS_LIMIT"))
-        self.gasPrice = web3.auto.w3.toWei(os.getenv("GAS_PRICE"), "gwei")
         self.w3.middleware_onion.inject(geth_poa_middleware, layer=0)
         self.bspContractAddress: str = bsp_proofchain_address
         self.brpContractAddress: str = brp_proofchain_address
-        with (MODULE_ROOT_PATH / "abi" / "BlockSpecimenProofChainContractABI").open(
-            "r"
-        ) as f:
-            self.bspContract = self.w3.eth.contract(
-                address=self.bspContractAddress, abi=f.read()
-            )
         self.logger = logformat.get_logger("Contract")
 
-        with (MODULE_ROOT_PATH / "abi" / "BlockResultProofChainContractABI").open(
-            "r"
-        ) as f:
-            self.brpContract = self.w3.eth.contract(
-                address=self.brpContractAddress, abi=f.read()
-            )
-        self.logger = logformat.get_logger("Contract")
+        self.bspEncoder = FinalizeCallEncoder(
+            MODULE_ROOT_PATH / "abi" / "BlockSpecimenProofChainContractABI",
+            "finalizeAndRewardSpecimenSession",
+            self.bspContractAddress,
+        )
+        self.brpEncoder = FinalizeCallEncoder(
+            MODULE_ROOT_PATH / "abi" / "BlockResultProofChainContractABI",
+            "finalizeAndRewardResultSession",
+            self.brpContractAddress,
+        )
 
     # asynchronous defined function to loop
     # this loop sets up an event filter and is looking for new entires for the "PairCreated" event
@@ -122,202 +156,476 @@ class ProofChainContract:
                 retries_left -= 1
                 exp += 1
 
-    def send_specimen_finalize(self, **kwargs):
-        return self._retry_with_backoff(self._attempt_send_specimen_finalize, **kwargs)
+    def send_specimen_finalizations(self, sessions, on_sent, on_receipt=None):
+        self._send_finalizations("specimen", sessions, on_sent, on_receipt)
+
+    def send_result_finalizations(self, sessions, on_sent, on_receipt=None):
+        self._send_finalizations("result", sessions, on_sent, on_receipt)
+
+    def account_for(self, session, available):
+        # None when the session's account can't send right now
+        if self.routing == ProofChainContract.BY_CHAIN:
+            # keeps every session of a chain on one nonce sequence
+            account = self.accounts[session.chainId % len(self.accounts)]
+            return account if account in available else None
+        if not available:
+            return None
+        return available[next(self.round_robin) % len(available)]
+
+    def _can_send(self, kind, account):
+        # an account whose in-flight window stays full, or whose balance is too low, would
+        # hold up every session sent alongside its own, so it is left out until that clears
+        if account.nonces.full_for() > self.window_wait:
+            return False
+        ledger = account.balance_ledger
+        unknown = ledger.balance is None
+        if (unknown or not ledger.funded()) and ledger.stale():
+            # a paused account gets no preflight reads, so top-ups are noticed here
+            self._refresh_balance(account)
+        return ledger.funded()
+
+    def _send_finalizations(self, kind, sessions, on_sent, on_receipt):
+        # sessions are anything with a chainId and blockHeight; on_sent(session) is called
+        # for every session that was sent or can be skipped, the rest are the caller's to retry
+        available = [a for a in self.accounts if self._can_send(kind, a)]
+        by_account = {}
+        held_back = 0
+        for session in sessions:
+            account = self.account_for(session, available)
+            if account is None:
+                held_back += 1
+                continue
+            by_account.setdefault(account, []).append(session)
+        if held_back:
+            self.logger.warning(
+                f"Holding back {held_back} {kind} sessions until their accounts can send"
+            )
 
-    def send_result_finalize(self, **kwargs):
-        return self._retry_with_backoff(self._attempt_send_result_finalize, **kwargs)
+        futures = [
+            self.executor.submit(
+                self._send_from, kind, account, account_sessions, on_sent, on_receipt
+            )
+            for account, account_sessions in by_account.items()
+        ]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        for ex in errors[1:]:
+            self.logger.critical("".join(traceback.format_exception(ex)))
+        if errors:
+            raise errors[0]
+
+    def _send_from(self, kind, account, sessions, on_sent, on_receipt):
+        with account.nonces.contending(kind):
+            while sessions:
+                sessions = self._retry_with_backoff(
+                    self._attempt_send_finalizations,
+                    kind=kind,
+                    account=account,
+                    sessions=sessions,
+                    on_sent=on_sent,
+                    on_receipt=on_receipt,
+                )
 
-    def _attempt_send_specimen_finalize(self, chainId, blockHeight, timeout):
-        if self.nonce is None:
-            self._refresh_nonce()
-        self.gasPrice = self.w3.eth.gasPrice
-        self.logger.info(
-            f"TX dynamic gas price for specimen finalization is {self.gasPrice}"
+    def _preflight(self, account, kind, sessions):
+        # independent reads the sends depend on, merged into one round trip along with a
+        # simulation of each finalization; returns the simulations' results, in order
+        batch = RPCBatch(self.provider)
+        fee_calls = [batch.add(m, p) for m, p in self.gas_oracle.requests()]
+        balance_calls = [batch.add(m, p) for m, p in account.balance_ledger.requests()]
+        chain_id_call = batch.add("eth_chainId", []) if self.chain_id is None else None
+        nonce_call = (
+            batch.add("eth_getTransactionCount", [account.address, "pending"])
+            if account.nonces.next_nonce is None
+            else None
         )
-        transaction = self.bspContract.functions.finalizeAndRewardSpecimenSession(
-            chainId, blockHeight
-        ).buildTransaction(
-            {
-                "to": self.bspContractAddress,
-                "gas": self.gas,
-                "gasPrice": self.gasPrice,
-                "from": self.finalizer_address,
-                "nonce": self.nonce,
-            }
-        )
-        signed_txn = self.w3.eth.account.signTransaction(
-            transaction, private_key=self.finalizer_prvkey
+        encoder = self.bspEncoder if kind == "specimen" else self.brpEncoder
+        simulation_calls = [
+            batch.add(
+                "eth_call",
+                [
+                    {
+                        "from": account.address,
+                        "to": encoder.to,
+                        "data": Web3.toHex(
+                            encoder.calldata(session.chainId, session.blockHeight)
+                        ),
+                    },
+                    "latest",
+                ],
+            )
+            for session in (sessions if self.simulate else [])
+        ]
+        results = batch.execute()
+        for result in results[: len(results) - len(simulation_calls)]:
+            if isinstance(result, ValueError):
+                raise result
+
+        self.gas_oracle.update([results[i] for i in fee_calls])
+        account.balance_ledger.update(
+            [results[i] for i in balance_calls], self.latest_block_number
         )
-
-        balance_before_send_wei = self.w3.eth.get_balance(self.finalizer_address)
-        balance_before_send_glmr = web3.auto.w3.fromWei(
-            balance_before_send_wei, "ether"
+        if chain_id_call is not None:
+            self.chain_id = int(results[chain_id_call], 16)
+        if nonce_call is not None:
+            account.nonces.sync(int(results[nonce_call], 16))
+            self.logger.info(
+                f"Refreshed nonce {account.nonces.next_nonce} sender={account}"
+            )
+        return [results[i] for i in simulation_calls] or [None] * len(sessions)
+
+    def _revert_reason(self, ex):
+        # the reason an eth_call reverted with, None when it failed for another reason,
+        # including batch slots that aren't JSON-RPC errors at all
+        error = ex.args[0] if len(ex.args) == 1 and isinstance(ex.args[0], dict) else {}
+        message = error.get("message")
+        if not isinstance(message, str):
+            return None
+        data = error.get("data")
+        if isinstance(data, dict):
+            data = data.get("data")
+        if isinstance(data, str) and data.startswith("0x08c379a0"):
+            # Error(string); malformed data falls back to the message
+            with contextlib.suppress(ValueError, OverflowError, DecodingError):
+                (reason,) = eth_abi.decode_abi(["string"], bytes.fromhex(data[10:]))
+                return reason
+        match = re.search(r"revert(?:ed)?:?\s*(.*)", message)
+        if match is not None:
+            return match.group(1) or "execution reverted"
+        if message.endswith("Session cannot be finalized"):
+            return message
+        return None
+
+    def _drop_reverting(self, kind, account, sessions, simulations, on_sent):
+        # sessions whose finalization would revert cost neither a nonce nor a signature;
+        # the ones that can never be finalized count as done, the others are left for the
+        # caller to try again later
+        viable = []
+        for session, result in zip(sessions, simulations):
+            reason = (
+                self._revert_reason(result) if isinstance(result, ValueError) else None
+            )
+            if reason is None:
+                viable.append(session)
+                continue
+            with self.lock:
+                self.simulated_reverts[(kind, reason)] += 1
+            self.logger.info(
+                f"Skipping {kind} session {session.chainId}/{session.blockHeight}"
+                f" that would revert: {reason}"
+            )
+            if reason == f"{kind.capitalize()} Session cannot be finalized":
+                account.count("skipped")
+                on_sent(session)
+            else:
+                account.count("deferred")
+        return viable
+
+    def _sign_finalize_tx(self, account, kind, chainId, blockHeight, nonce, fees):
+        encoder = self.bspEncoder if kind == "specimen" else self.brpEncoder
+        transaction = encoder.transaction(
+            chainId,
+            blockHeight,
+            {"gas": self.gas, **fees, "nonce": nonce, "chainId": self.chain_id},
         )
-
-        predicted_tx_hash = eth_hash.auto.keccak(signed_txn.rawTransaction)
-
-        self.logger.info(
-            f"Sending Specimen finalization tx {chainId}/{blockHeight}"
-            f" senderBalance={balance_before_send_glmr}GLMR"
-            f" senderNonce={self.nonce}"
-            f" txHash=0x{predicted_tx_hash.hex()}"
+        return self.w3.eth.account.signTransaction(
+            transaction, private_key=account.private_key
         )
 
-        tx_hash = None
-        try:
-            tx_hash = self.w3.eth.sendRawTransaction(signed_txn.rawTransaction)
-            return self.report_transaction_receipt(tx_hash, timeout)
-        except ValueError as ex:
-            if len(ex.args) != 1 or type(ex.args[0]) != dict:
-                raise
-
-            jsonrpc_err = ex.args[0]
-            if "code" not in jsonrpc_err or "message" not in jsonrpc_err:
-                raise
-
-            match (jsonrpc_err["code"], jsonrpc_err["message"]):
-                case (-32603, "nonce too low"):
-                    self.report_transaction_bounce(
-                        predicted_tx_hash,
-                        err="nonce too low",
-                        details={"txNonce": self.nonce},
-                    )
-                    self.logger.info(
-                        "Pausing to allow pending txs to clear, then refreshing nonce..."
-                    )
-                    time.sleep(60)
-                    self._refresh_nonce()
-
-                    # retry immediately (we already waited)
-                    return (False, 0)
-                case (-32603, "Specimen Session cannot be finalized"):
-                    self.logger.info(
-                        "Skipping specimen session that cannot be finalized..."
-                    )
-                    return (True, None)
-                # case (-32603, "already known"):
-                #     self.logger.info(
-                #         "Skipping specimen finalization tx that's already known..."
-                #     )
-                #     return (True, None)
-                case _:
-                    raise
-
-    def _attempt_send_result_finalize(self, chainId, blockHeight, timeout):
-        if self.nonce is None:
-            self._refresh_nonce()
-        self.gasPrice = self.w3.eth.gasPrice
-        self.logger.info(
-            f"TX dynamic gas price for result finalization is {self.gasPrice}"
-        )
-        transaction = self.brpContract.functions.finalizeAndRewardResultSession(
-            chainId, blockHeight
-        ).buildTransaction(
+    def _sign_filler_tx(self, account, nonce, fees):
+        # a zero-value transfer to ourselves, used to plug a nonce no session ended up using
+        return self.w3.eth.account.signTransaction(
             {
-                "to": self.brpContractAddress,
-                "gas": self.gas,
-                "gasPrice": self.gasPrice,
-                "from": self.finalizer_address,
-                "nonce": self.nonce,
-            }
-        )
-        signed_txn = self.w3.eth.account.signTransaction(
-            transaction, private_key=self.finalizer_prvkey
+                "to": account.address,
+                "value": 0,
+                "gas": 21000,
+                **fees,
+                "nonce": nonce,
+                "chainId": self.chain_id,
+            },
+            private_key=account.private_key,
         )
 
-        balance_before_send_wei = self.w3.eth.get_balance(self.finalizer_address)
-        balance_before_send_glmr = web3.auto.w3.fromWei(
-            balance_before_send_wei, "ether"
-        )
-
-        predicted_tx_hash = eth_hash.auto.keccak(signed_txn.rawTransaction)
+    def _sign_tx(self, account, kind, chainId, blockHeight, nonce, fees):
+        if kind == InFlightTx.FILLER:
+            return self._sign_filler_tx(account, nonce, fees)
+        return self._sign_finalize_tx(account, kind, chainId, blockHeight, nonce, fees)
+
+    def _attempt_send_finalizations(self, kind, account, sessions, on_sent, on_receipt):
+        # only as many as there is room for in the in-flight window are simulated and
+        # sent this round, the rest wait for the next one; once the window stays full, or the
+        # balance is too low, the remaining sessions are left to the caller
+        room = account.nonces.room(kind, timeout=self.window_wait)
+        if room == 0:
+            return (True, [])
+        sessions, later = sessions[:room], sessions[room:]
+        simulations = self._preflight(account, kind, sessions)
+        sessions = self._drop_reverting(kind, account, sessions, simulations, on_sent)
+        if not sessions:
+            return (True, later)
+        if not account.balance_ledger.funded():
+            return (True, [])
+        fees = self.gas_oracle.current()
+
+        with account.nonces.reserve(len(sessions)) as nonces:
+            # the window may have filled up since room(): whatever got no nonce waits
+            reserved = len(nonces)
+            later = sessions[reserved:] + later
+            batch, sending = self._sign_round(kind, account, sessions, nonces, fees)
+            retry = self._settle_round(
+                kind, account, sending, batch.execute(), fees, on_sent, on_receipt
+            )
 
-        self.logger.info(
-            f"Sending Result finalization tx {chainId}/{blockHeight}"
-            f" senderBalance={balance_before_send_glmr}GLMR"
-            f" senderNonce={self.nonce}"
-            f" txHash=0x{predicted_tx_hash.hex()}"
+        if retry:
+            # something else used these nonces; catch up with the chain before resending
+            self._refresh_nonce_after_send(account)
+        return (True, retry + later)
+
+    def _sign_round(self, kind, account, sessions, nonces, fees):
+        # signs one tx per reserved nonce into a batch of eth_sendRawTransaction calls;
+        # returns the batch and the (session, nonce, signed tx, tx hash) of each call
+        balance_glmr = web3.auto.w3.fromWei(account.balance_ledger.spendable(), "ether")
+        batch = RPCBatch(self.provider)
+        sending = []
+        for session, nonce in zip(sessions, nonces):
+            signed_txn = self._sign_finalize_tx(
+                account, kind, session.chainId, session.blockHeight, nonce, fees
+            )
+            predicted_tx_hash = eth_hash.auto.keccak(signed_txn.rawTransaction)
+            self.logger.info(
+                f"Sending {kind.capitalize()} finalization tx"
+                f" {session.chainId}/{session.blockHeight}"
+                f" sender={account}"
+                f" senderBalance={balance_glmr}GLMR"
+                f" senderNonce={nonce}"
+                f" inFlight={account.nonces.count()}"
+                f" txHash=0x{predicted_tx_hash.hex()}"
+            )
+            batch.add("eth_sendRawTransaction", [Web3.toHex(signed_txn.rawTransaction)])
+            sending.append((session, nonce, signed_txn, predicted_tx_hash))
+        return batch, sending
+
+    def _settle_round(self, kind, account, sending, results, fees, on_sent, on_receipt):
+        # commits every accepted tx and sorts out the rejected ones; returns the sessions
+        # to send again. The node applies the batch in order, so a rejected tx leaves a
+        # nonce gap that the next send (or a filler tx) plugs
+        retry = []
+        for entry, result in zip(sending, results):
+            try:
+                if self._settle_tx(
+                    kind, account, entry, result, fees, on_sent, on_receipt
+                ):
+                    retry.append(entry[0])
+            except Exception as ex:
+                # the batch went out, so anything raised here is this tx's problem alone;
+                # retrying the round would re-sign the sessions already sent in it
+                self.logger.critical("".join(traceback.format_exception(ex)))
+        return retry
+
+    def _settle_tx(self, kind, account, entry, result, fees, on_sent, on_receipt):
+        # returns whether the session should be sent again at once
+        session, nonce, signed_txn, predicted_tx_hash = entry
+        if not isinstance(result, ValueError):
+            self.__commit(
+                account,
+                InFlightTx(
+                    nonce,
+                    predicted_tx_hash,
+                    signed_txn.rawTransaction,
+                    kind,
+                    session.chainId,
+                    session.blockHeight,
+                    fees,
+                    on_receipt=functools.partial(on_receipt, session)
+                    if on_receipt is not None
+                    else None,
+                ),
+                self.gas,
+            )
+            account.count("sent")
+            on_sent(session)
+            return False
+
+        outcome = self._rejected(kind, account, nonce, predicted_tx_hash, result)
+        if outcome == "skip":
+            on_sent(session)
+        return outcome == "retry"
+
+    def _rejected(self, kind, account, nonce, predicted_tx_hash, error):
+        # reports a tx the node rejected; returns "retry" when its session should go out
+        # again at once, "skip" when it needs no finalization, None to leave it to the caller
+        match self._jsonrpc_error(error):
+            case (-32603, "nonce too low"):
+                self.report_transaction_bounce(
+                    predicted_tx_hash,
+                    err="nonce too low",
+                    details={"sender": account, "txNonce": nonce},
+                )
+                account.count("bounced")
+                return "retry"
+            case (-32603, message) if (
+                message == f"{kind.capitalize()} Session cannot be finalized"
+            ):
+                self.logger.info(f"Skipping {kind} session that cannot be finalized...")
+                account.count("skipped")
+                return "skip"
+            case (code, message):
+                self.report_transaction_bounce(
+                    predicted_tx_hash,
+                    err=message,
+                    details={"code": code, "sender": account, "txNonce": nonce},
+                )
+                account.count("bounced")
+                return None
+
+    def _jsonrpc_error(self, ex):
+        # unpacks the (code, message) of a JSON-RPC error raised by web3; the code is None
+        # for errors that carry none, e.g. a call missing from a batch response
+        if len(ex.args) != 1 or type(ex.args[0]) != dict:
+            return (None, str(ex))
+        jsonrpc_err = ex.args[0]
+        return (jsonrpc_err.get("code"), jsonrpc_err.get("message", str(jsonrpc_err)))
+
+    def resend_transaction(self, account, tx):
+        # re-broadcasts a tx the node may have dropped, so it stops holding up later nonces
+        try:
+            self.w3.eth.sendRawTransaction(tx.raw_tx)
+            account.count("resent")
+            self.logger.warning(f"TX re-sent {tx} sender={account}")
+        except ValueError as ex:
+            self.logger.info(f"TX re-send of {tx} rejected: {self._jsonrpc_error(ex)}")
+
+    def replace_transaction(self, account, tx):
+        # re-signs a stuck tx with the same nonce and higher fees
+        self._refresh_fees()
+        if self.__send_in_flight(
+            account,
+            tx.nonce,
+            tx.kind,
+            tx.chainId,
+            tx.blockHeight,
+            self.gas_oracle.bumped(tx.fees),
+            on_receipt=tx.on_receipt,
+            replaced_hashes=tx.hashes(),
+        ):
+            account.count("replaced")
+
+    def fill_nonce(self, account, nonce):
+        self._refresh_fees()
+        if self.__send_in_flight(
+            account, nonce, InFlightTx.FILLER, None, None, self.gas_oracle.current()
+        ):
+            account.count("fillers")
+
+    def _refresh_balance(self, account):
+        batch = RPCBatch(self.provider)
+        for method, params in account.balance_ledger.requests():
+            batch.add(method, params)
+        account.balance_ledger.update(batch.execute(), self.latest_block_number)
+
+    def _refresh_fees(self):
+        batch = RPCBatch(self.provider)
+        for method, params in self.gas_oracle.requests():
+            batch.add(method, params)
+        self.gas_oracle.update(batch.execute())
+
+    def __commit(self, account, tx, gas):
+        account.nonces.commit(tx)
+        max_fee = tx.fees.get("maxFeePerGas", tx.fees.get("gasPrice", 0))
+        account.balance_ledger.reserve(tx.nonce, gas * max_fee)
+
+    def __send_in_flight(
+        self, account, nonce, kind, chainId, blockHeight, fees, **kwargs
+    ):
+        signed_txn = self._sign_tx(account, kind, chainId, blockHeight, nonce, fees)
+        tx = InFlightTx(
+            nonce,
+            eth_hash.auto.keccak(signed_txn.rawTransaction),
+            signed_txn.rawTransaction,
+            kind,
+            chainId,
+            blockHeight,
+            fees,
+            **kwargs,
         )
-
-        tx_hash = None
         try:
-            tx_hash = self.w3.eth.sendRawTransaction(signed_txn.rawTransaction)
-            return self.report_transaction_receipt(tx_hash, timeout)
+            self.w3.eth.sendRawTransaction(signed_txn.rawTransaction)
         except ValueError as ex:
-            if len(ex.args) != 1 or type(ex.args[0]) != dict:
-                raise
-
-            jsonrpc_err = ex.args[0]
-            if "code" not in jsonrpc_err or "message" not in jsonrpc_err:
-                raise
-
-            match (jsonrpc_err["code"], jsonrpc_err["message"]):
-                case (-32603, "nonce too low"):
-                    self.report_transaction_bounce(
-                        predicted_tx_hash,
-                        err="nonce too low",
-                        details={"txNonce": self.nonce},
-                    )
-                    self.logger.info(
-                        "Pausing to allow pending txs to clear, then refreshing nonce..."
-                    )
-                    time.sleep(60)
-                    self._refresh_nonce()
-
-                    # retry immediately (we already waited)
-                    return (False, 0)
-                case (-32603, "Result Session cannot be finalized"):
-                    self.logger.info(
-                        "Skipping Result session that cannot be finalized..."
-                    )
-                    return (True, None)
-                # case (-32603, "already known"):
-                #     self.logger.info(
-                #         "Skipping Result finalization tx that's already known..."
-                #     )
-                #     return (True, None)
-                case _:
-                    raise
+            self.logger.info(f"TX {tx} rejected: {self._jsonrpc_error(ex)}")
+            return False
+        self.__commit(account, tx, 21000 if kind == InFlightTx.FILLER else self.gas)
+        self.logger.warning(
+            f"TX sent out of band {tx} sender={account} {GasOracle.describe(tx.fees)}"
+        )
+        return True
 
     def report_transaction_bounce(self, predicted_tx_hash, err, details):
         bounce = LoggableBounce(predicted_tx_hash, err=err, details=details)
         self.logger.error(f"TX bounced with {bounce}")
 
-    def report_transaction_receipt(self, tx_hash, timeout, **kwargs):
-        if timeout is None:
-            return (True, None)
-
+    def report_transaction_receipt(self, account, tx, receipt):
+        # receipt is None when the nonce was mined under a hash we never broadcast
+        if receipt is None:
+            self.logger.info(f"TX settled without a receipt for {tx}")
+            account.count("settled")
+        elif receipt.succeeded():
+            self.logger.info(f"TX mined with {receipt}")
+            account.count("mined")
+        else:
+            self.logger.warning(f"TX failed with {receipt} for {tx}")
+            account.count("failed")
+        if receipt is not None:
+            account.count("gasUsed", receipt.gasUsed)
+        account.balance_ledger.settle(tx.nonce, receipt)
+
+        if tx.on_receipt is not None:
+            tx.on_receipt(receipt)
+
+    def _refresh_nonce_after_send(self, account):
+        # the round's txs are out, so a failure here must not get it retried as a whole;
+        # the next "nonce too low" asks again
         try:
-            self.w3.eth.wait_for_transaction_receipt(
-                tx_hash, timeout=timeout, poll_latency=1.0
-            )
-            receipt = LoggableReceipt(
-                self.w3.eth.get_transaction_receipt(tx_hash), **kwargs
-            )
-
-            if receipt.succeeded():
-                self.nonce += 1
-                self.logger.info(f"TX mined with {receipt}")
-            else:
-                self.logger.warning(f"TX failed with {receipt}")
-
-            return (True, None)
-
-        except TimeExhausted:
-            self.increase_gas_price()
-            # retry immediately
-            return (False, 0)
+            self._refresh_nonce(account)
+        except Exception as ex:
+            self.logger.warning(f"Nonce refresh failed sender={account}: {ex!r}")
+
+    def _refresh_nonce(self, account):
+        # "pending" also counts our own txs still in the mempool
+        account.nonces.sync(
+            self.w3.eth.get_transaction_count(account.address, "pending")
+        )
+        self.logger.info(
+            f"Refreshed nonce {account.nonces.next_nonce} sender={account}"
+        )
 
-    def _refresh_nonce(self):
-        self.nonce = self.w3.eth.get_transaction_count(self.finalizer_address)
-        self.logger.info(f"Refreshed nonce {self.nonce}")
+    def log_rpc_metrics(self):
+        metrics = " ".join(
+            f"{k}={v}" for k, v in self.provider.limiter.metrics().items()
+        )
+        self.logger.info(f"RPC {metrics}")
+
+    def log_account_metrics(self):
+        for account in self.accounts:
+            metrics = " ".join(f"{k}={v}" for k, v in account.metrics().items())
+            self.logger.info(f"Finalizer account {account} {metrics}")
+        with self.lock:
+            simulated_reverts = dict(self.simulated_reverts)
+        for (kind, reason), count in sorted(simulated_reverts.items()):
+            self.logger.info(
+                f"Skipped {count} {kind} sessions that would revert: {reason}"
+            )
 
     def block_number(self):
         return self._retry_with_backoff(self._attempt_block_number)
 
     def _attempt_block_number(self):
-        return (True, self.w3.eth.get_block("latest").number)
+        block_number = self.w3.eth.block_number
+        self.new_head(block_number)
+        return (True, block_number)
+
+    def new_head(self, block_number):
+        # polled and subscribed heads can arrive out of order
+        if self.latest_block_number is None or block_number > self.latest_block_number:
+            self.latest_block_number = block_number
+            self.gas_oracle.new_block(block_number)
 
     # def subscribe_on_event(self, cb, from_block=1):
     #     event_filter = self.contract.events.SessionStarted.createFilter(fromBlock=from_block)
@@ -331,24 +639,3 @@ class ProofChainContract:
     #     finally:
     #         # close loop to free up system resources
     #         loop.close()
-    def estimate_gas_price(self):
-        pending_transactions = self.provider.make_request(
-            "parity_futureTransactions", []
-        )
-        gas_prices = []
-        gases = []
-        print(pending_transactions)
-        for tx in pending_transactions["result"[:10]]:
-            gas_prices.append(int((tx["gasPrice"]), 16))
-            gases.append(int((tx["gas"]), 16))
-        print("Average:")
-        print("-" * 80)
-        print("gasPrice: ", statistics.mean(gas_prices))
-        print(" ")
-        print("Median:")
-        print("-" * 80)
-        print("gasPrice: ", statistics.median(gas_prices))
-
-    def increase_gas_price(self):
-        # try to replace the unmined trx next time in emergency cases
-        self.gasPrice = int(self.gasPrice * 1.15)
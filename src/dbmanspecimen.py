@@ -5,127 +5,242 @@ import traceback
 import psycopg2
 import logformat
 
+from dbnotify import DBNotificationListener
 from finalizationspecimenrequest import FinalizationSpecimenRequest
 
 
 class DBManagerSpecimen(threading.Thread):
     caught_up: bool = False
     last_block_id: int
+    last_finalization_block_id: int
+    resume_block_id: int
     starting_point: int
     logger: logging.Logger
 
-    def __init__(self, user, password, database, host, starting_point, chain_table):
+    def __init__(
+        self,
+        pool,
+        starting_point,
+        chain_table,
+        chunk_size=10000,
+        listen_channel=None,
+        source="view",
+    ):
         super().__init__()
-        self.host = host
-        self.database = database
-        self.password = password
-        self.user = user
+        self.pool = pool
+        self.source = source
+        self.listener = (
+            DBNotificationListener(pool, listen_channel) if listen_channel else None
+        )
         self.last_block_id = None
+        self.last_finalization_block_id = None
+        self.resume_block_id = None
         self.chain_table = chain_table
+        self.chunk_size = chunk_size
 
         self.logger = logformat.get_logger("DB")
         self.starting_point = starting_point
 
-    def _process_outputs(self, outputs):
+    def _to_request(self, output):
+        # numeric columns arrive as Decimal; ints are far smaller to keep around
+        return FinalizationSpecimenRequest(
+            chainId=int(output[3]),
+            blockHeight=int(output[4]),
+            deadline=int(output[5]),
+            block_id=output[1],
+        )
+
+    def _process_session_starts(self, outputs):
         fl = 0
-        c = 0
         prev_last_block_id = self.last_block_id
         for output in outputs:
-            block_id = output[1]
-            blockHeight = output[4]
-            chainId = output[3]
-            deadline = output[5]
+            self.last_block_id = max(self.last_block_id, output[1])
             finalizationHash = output[6]
-            fr = FinalizationSpecimenRequest(
-                chainId=chainId,
-                blockHeight=blockHeight,
-                deadline=deadline,
-                block_id=block_id,
-            )
-
-            if finalizationHash is None:
-                if not fr.waiting_for_confirm() and not fr.waiting_for_finalize():
-                    if fr.finalize_later():
-                        fl += 1
-            else:
-                if fr.waiting_for_confirm():
-                    if fr.confirm_request():
-                        self._update_cursor(fr.session_started_block_id)
-                        c += 1
+            if finalizationHash is not None:
+                # finalized before we ever saw it; nothing to do
+                continue
+            chainId = int(output[3])
+            blockHeight = int(output[4])
+            if FinalizationSpecimenRequest.is_waiting_for_confirm(
+                chainId, blockHeight
+            ) or FinalizationSpecimenRequest.is_waiting_for_finalize(
+                chainId, blockHeight
+            ):
+                continue
+            if self._to_request(output).finalize_later():
+                fl += 1
         if fl > 0:
             self.logger.info(f"Queued {fl} specimen proof-sessions for finalization")
-        if c > 0:
-            self.logger.info(f"Confirmed {c} specimen proof-sessions")
         if self.last_block_id > prev_last_block_id:
             self.logger.info(f"Updated cursor position block_id={self.last_block_id}")
 
-        return fl + c
+        return fl
 
-    def __connect(self):
-        return psycopg2.connect(
-            host=self.host,
-            database=self.database,
-            user=self.user,
-            password=self.password,
-        )
+    def _process_finalizations(self, outputs):
+        c = 0
+        for output in outputs:
+            self.last_finalization_block_id = max(
+                self.last_finalization_block_id, output[7]
+            )
+            fr = FinalizationSpecimenRequest.lookup_request_to_be_confirmed(
+                int(output[3]), int(output[4])
+            )
+            if fr is not None:
+                fr.confirm_request()
+                c += 1
+            else:
+                # finalized before our own tx was mined, or by someone else
+                FinalizationSpecimenRequest.discard_request_to_be_finalized(
+                    int(output[3]), int(output[4])
+                )
+        if c > 0:
+            self.logger.info(f"Confirmed {c} specimen proof-sessions")
 
-    def __main_loop(self):
-        try:
-            self.logger.info("Connecting to the database...")
-            if not self.caught_up:
-                self.logger.info(f"Initial scan block_id={self.last_block_id}")
+        return c
 
-                with self.__connect() as conn:
-                    with conn.cursor() as cur:
-                        # we are catching up. So we only need to grab what we need to attempt for finalizing
-                        if self.chain_table == "chain_moonbeam_moonbase_alpha":
-                            cur.execute(
-                                r'SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > %s AND observer_chain_finalization_tx_hash IS NULL AND origin_chain_block_height > 17679865;',
-                                (self.last_block_id,),
-                            )
-                        else:
-                            cur.execute(
-                                r'SELECT * FROM chain_moonbeam_mainnet."_proof_chain_events" WHERE observer_chain_session_start_block_id > %s AND observer_chain_finalization_tx_hash IS NULL;',
-                                (self.last_block_id,),
-                            )
-                        outputs = cur.fetchall()
+    def __relation(self):
+        if self.source == "table":
+            return f'{self.chain_table}."_proof_chain_specimen_sessions"'
+        if self.chain_table == "chain_moonbeam_moonbase_alpha":
+            return 'chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events"'
+        return 'chain_moonbeam_mainnet."_proof_chain_specimen_events"'
 
-                self.logger.info(
-                    f"Processing {len(outputs)} specimen proof-session records..."
-                )
-                self._process_outputs(outputs)
+    def __view_query(self, select, condition, suffix=""):
+        if self.chain_table == "chain_moonbeam_moonbase_alpha":
+            condition += " AND origin_chain_block_height > 17679865"
+        return f"SELECT {select} FROM {self.__relation()} WHERE {condition} {suffix}"
 
-                self.caught_up = True
-                self.logger.info(f"Caught up with db block_id={self.last_block_id}")
+    def __main_loop(self):
+        try:
+            while not self.caught_up:
+                self.__catch_up()
 
             while True:
-                with self.__connect() as conn:
+                started = time.perf_counter()
+                with self.pool.connection() as conn:
+                    acquired = time.perf_counter()
                     with conn.cursor() as cur:
                         self.logger.info(
                             f"Incremental scan block_id={self.last_block_id}"
+                            f" finalization_block_id={self.last_finalization_block_id}"
                         )
-                        # we need everything after last max block number
-                        if self.chain_table == "chain_moonbeam_moonbase_alpha":
+                        # only sessions started after the last one we have seen, unless
+                        # the finalizer is too far behind to take any more...
+                        session_starts = []
+                        if FinalizationSpecimenRequest.wait_for_room_to_be_finalized(
+                            timeout=0
+                        ):
                             cur.execute(
-                                r'SELECT * FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_session_start_block_id > %s AND origin_chain_block_height > 17679865;',
+                                self.__view_query(
+                                    "*", "observer_chain_session_start_block_id > %s"
+                                ),
                                 (self.last_block_id,),
                             )
+                            session_starts = cur.fetchall()
                         else:
-                            cur.execute(
-                                r'SELECT * FROM chain_moonbeam_mainnet."_proof_chain_events"  WHERE observer_chain_session_start_block_id > %s;',
-                                (self.last_block_id,),
+                            self.logger.info(
+                                "Finalization backlog full, not scanning for new specimen proof-sessions"
                             )
+                        # ...and only finalizations we have not seen yet
+                        cur.execute(
+                            self.__view_query(
+                                "*", "observer_chain_finalization_block_id > %s"
+                            ),
+                            (self.last_finalization_block_id,),
+                        )
+                        finalizations = cur.fetchall()
+                    queried = time.perf_counter()
 
-                        outputs = cur.fetchall()
-
-                if self._process_outputs(outputs) == 0:
+                self.logger.debug(
+                    f"Incremental scan rows={len(session_starts) + len(finalizations)}"
+                    f" acquire={(acquired - started) * 1000:.1f}ms"
+                    f" query={(queried - acquired) * 1000:.1f}ms"
+                    f" handshakes={self.pool.handshakes}"
+                )
+                discovered = self._process_session_starts(
+                    session_starts
+                ) + self._process_finalizations(finalizations)
+                self._update_cursor()
+                if discovered == 0:
                     self.logger.info("No new specimen proof-session records discovered")
 
-                time.sleep(10)
+                self.__wait_for_changes()
 
         except (Exception, psycopg2.DatabaseError) as ex:
             self.logger.critical("".join(traceback.format_exception(ex)))
 
+    def __catch_up(self):
+        self.logger.info(f"Initial scan block_id={self.last_block_id}")
+        paused = False
+        scan_block_id = self.last_block_id
+        with self.pool.connection() as conn:
+            if self.last_finalization_block_id is None:
+                # finalizations landing after this point are picked up by the incremental scan
+                with conn.cursor() as cur:
+                    cur.execute(
+                        self.__view_query(
+                            "max(observer_chain_finalization_block_id)", "TRUE"
+                        )
+                    )
+                    self.last_finalization_block_id = cur.fetchone()[0] or 0
+
+            # a named (server-side) cursor streams the backlog in chunks
+            # instead of materializing every row client-side
+            with conn.cursor(name="specimen_catch_up") as cur:
+                cur.itersize = self.chunk_size
+                # we are catching up. So we only need to grab what we need to attempt for finalizing;
+                # in block_id order, so a paused scan can resume from last_block_id
+                cur.execute(
+                    self.__view_query(
+                        "*",
+                        "observer_chain_session_start_block_id > %s AND observer_chain_finalization_tx_hash IS NULL",
+                        "ORDER BY observer_chain_session_start_block_id",
+                    ),
+                    (self.last_block_id,),
+                )
+                processed = 0
+                while True:
+                    if not FinalizationSpecimenRequest.wait_for_room_to_be_finalized(
+                        timeout=0
+                    ):
+                        paused = True
+                        break
+                    outputs = cur.fetchmany(cur.itersize)
+                    if not outputs:
+                        break
+                    processed += len(outputs)
+                    self.logger.info(
+                        f"Processing {len(outputs)} specimen proof-session records (total={processed})..."
+                    )
+                    self._process_session_starts(outputs)
+
+        if paused:
+            # backpressure: the scan's transaction (and its snapshot) ended with the
+            # connection above, so waiting holds neither a pool slot nor the database
+            # back; the last block read may have been cut short, so it is read again
+            if self.last_block_id > scan_block_id:
+                self.last_block_id -= 1
+            self.logger.info(
+                "Finalization backlog full, pausing specimen proof-session catch-up..."
+            )
+            FinalizationSpecimenRequest.wait_for_room_to_be_finalized()
+            return
+
+        self.caught_up = True
+        self._update_cursor()
+        self.logger.info(f"Caught up with db block_id={self.last_block_id}")
+        sessions, size = FinalizationSpecimenRequest.memory_footprint()
+        self.logger.info(
+            f"Holding {sessions} specimen proof-sessions"
+            f" bytesPerSession={size // max(sessions, 1)}"
+        )
+
+    def __wait_for_changes(self):
+        if self.listener is None:
+            time.sleep(10)
+        elif self.listener.wait(timeout=10):
+            self.logger.debug("Woken up by proof-chain notification")
+
     def run(self):
         # we need to avoid recursion in order to avoid stack depth exceeded exception
         if self.starting_point != -1:
@@ -144,16 +259,15 @@ class DBManagerSpecimen(threading.Thread):
     def __fetch_last_block(self):
         try:
             self.logger.info("Determining initial cursor position...")
-            with self.__connect() as conn:
+            with self.pool.connection() as conn:
                 with conn.cursor() as cur:
-                    if self.chain_table == "chain_moonbeam_moonbase_alpha":
-                        cur.execute(
-                            r'SELECT observer_chain_session_start_block_id FROM chain_moonbeam_moonbase_alpha."_proof_chain_specimen_events" WHERE observer_chain_finalization_tx_hash IS NULL LIMIT 1'
-                        )
-                    else:
-                        cur.execute(
-                            r'SELECT observer_chain_session_start_block_id FROM chain_moonbeam_mainnet."_proof_chain_events" WHERE observer_chain_finalization_tx_hash IS NULL LIMIT 1'
+                    cur.execute(
+                        self.__view_query(
+                            "observer_chain_session_start_block_id",
+                            "observer_chain_finalization_tx_hash IS NULL",
+                            "LIMIT 1",
                         )
+                    )
                     block_id = cur.fetchone()
             if block_id is not None:
                 self.last_block_id = block_id[0] - 1
@@ -162,11 +276,11 @@ class DBManagerSpecimen(threading.Thread):
         except Exception as ex:
             self.logger.warning("".join(traceback.format_exception(ex)))
 
-    def _update_cursor(self, block_id):
-        for fr in FinalizationSpecimenRequest.get_requests_to_be_confirmed():
-            if fr.session_started_block_id < block_id:
-                return
-        for fr in FinalizationSpecimenRequest.get_requests_to_be_finalized():
-            if fr.session_started_block_id < block_id:
-                return
-        self.last_block_id = block_id
+    def _update_cursor(self):
+        # the resume position is the block_id a restart (BLOCK_ID_START) can safely
+        # scan from: every session started at or before it is finalized and confirmed
+        oldest = FinalizationSpecimenRequest.oldest_outstanding_block_id()
+        resume_block_id = self.last_block_id if oldest is None else oldest - 1
+        if resume_block_id != self.resume_block_id:
+            self.resume_block_id = resume_block_id
+            self.logger.info(f"Updated resume position block_id={self.resume_block_id}")
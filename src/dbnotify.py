@@ -0,0 +1,60 @@
+import contextlib
+import select
+import time
+import traceback
+import psycopg2
+from psycopg2 import sql
+import logformat
+
+
+class DBNotificationListener:
+    def __init__(self, pool, channel, debounce=0.2):
+        self.pool = pool
+        self.channel = channel
+        self.debounce = debounce
+        self.conn = None
+
+        self.logger = logformat.get_logger("DB")
+
+    def __listen(self):
+        self.conn = self.pool.open_dedicated()
+        self.conn.set_session(autocommit=True)
+        with self.conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+        self.logger.info(
+            f"Listening for proof-chain notifications channel={self.channel}"
+        )
+
+    def __drain(self):
+        self.conn.poll()
+        notified = len(self.conn.notifies) > 0
+        self.conn.notifies.clear()
+        return notified
+
+    def wait(self, timeout):
+        # returns True when woken by a notification, False on timeout or listener failure;
+        # callers are expected to run their regular poll either way
+        try:
+            if self.conn is None or self.conn.closed:
+                self.__listen()
+            if self.__drain():
+                return True
+            if select.select([self.conn], [], [], timeout) == ([], [], []):
+                return False
+            # a burst of inserts produces a burst of notifications; coalesce them into one wakeup
+            time.sleep(self.debounce)
+            return self.__drain()
+        except (psycopg2.Error, OSError) as ex:
+            error = "".join(traceback.format_exception_only(ex))
+            self.logger.warning(
+                f"Notification listener failed, falling back to polling: {error}"
+            )
+            self.close()
+            time.sleep(timeout)
+            return False
+
+    def close(self):
+        if self.conn is not None:
+            with contextlib.suppress(psycopg2.Error):
+                self.conn.close()
+            self.conn = None
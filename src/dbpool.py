@@ -0,0 +1,109 @@
+import contextlib
+import threading
+import time
+import psycopg2
+import logformat
+
+
+class DBConnectionPool:
+    handshakes: int = 0
+    reconnects: int = 0
+
+    def __init__(
+        self, user, password, database, host, size=2, health_check_interval=30
+    ):
+        self.host = host
+        self.database = database
+        self.password = password
+        self.user = user
+        self.size = size
+        self.health_check_interval = health_check_interval
+
+        self.logger = logformat.get_logger("DB")
+        # idle connections as (connection, last_used_at) pairs, most recently used last
+        self.__idle = []
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(size)
+
+    def __connect(self):
+        started = time.perf_counter()
+        conn = psycopg2.connect(
+            host=self.host,
+            database=self.database,
+            user=self.user,
+            password=self.password,
+        )
+        with self.__lock:
+            self.handshakes += 1
+        self.logger.debug(
+            f"Opened database connection handshake={(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+        return conn
+
+    def open_dedicated(self):
+        # connections that must not be shared (e.g. LISTEN sessions) bypass the pool
+        return self.__connect()
+
+    def __is_healthy(self, conn, last_used_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used_at < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def __checkout(self):
+        while True:
+            with self.__lock:
+                if not self.__idle:
+                    break
+                conn, last_used_at = self.__idle.pop()
+            if self.__is_healthy(conn, last_used_at):
+                return conn
+            self.__discard(conn)
+        return self.__connect()
+
+    def __discard(self, conn):
+        with self.__lock:
+            self.reconnects += 1
+        with contextlib.suppress(psycopg2.Error):
+            conn.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        self.__slots.acquire()
+        conn = None
+        try:
+            conn = self.__checkout()
+            try:
+                yield conn
+                conn.commit()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                # the connection is probably broken; drop it so the next checkout reconnects
+                self.__discard(conn)
+                conn = None
+                raise
+            except Exception:
+                if not conn.closed:
+                    conn.rollback()
+                raise
+        finally:
+            if conn is not None:
+                if conn.closed:
+                    self.__discard(conn)
+                else:
+                    with self.__lock:
+                        self.__idle.append((conn, time.monotonic()))
+            self.__slots.release()
+
+    def close(self):
+        with self.__lock:
+            idle, self.__idle = self.__idle, []
+        for conn, _ in idle:
+            with contextlib.suppress(psycopg2.Error):
+                conn.close()
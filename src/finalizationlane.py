@@ -0,0 +1,122 @@
+import threading
+import time
+import traceback
+
+import logformat
+
+from headtracker import HeadTracker
+from schedulingpolicy import OldestDeadlineFirst, SchedulingPolicy
+
+
+class FinalizationLane(threading.Thread):
+    # sends the finalizations of one session kind from its own queue, so a backlog of one
+    # kind never holds up the other; the lanes share the accounts' nonce allocators, which
+    # split the room in an in-flight window between the lanes waiting on it
+    def __init__(
+        self,
+        kind,
+        send,
+        heads: HeadTracker,
+        policy: SchedulingPolicy = None,
+        batch_size=64,
+        max_queued=1024,
+        on_room=None,
+        metrics_interval=60,
+    ):
+        super().__init__(name=f"{kind}-lane")
+        self.kind = kind
+        # send(sessions) returns the ones that were finalized, once each one was sent,
+        # skipped or rescheduled
+        self.send = send
+        self.heads = heads
+        # the queue of ready sessions, and the order they are sent in
+        self.policy = policy if policy is not None else OldestDeadlineFirst()
+        self.batch_size = batch_size
+        # the lane holds at most max_queued sessions of each chain; past that they wait in
+        # the registry, and on_room() is called whenever a send round has made room again
+        self.max_queued = max_queued
+        self.on_room = on_room
+        self.metrics_interval = metrics_interval
+        self.logger = logformat.get_logger("Finalizer")
+        self.cond = threading.Condition()
+        self.finalized = 0
+        self.finalized_at_last_metrics = 0
+        self.last_metrics_at = time.monotonic()
+
+    def room(self, chainId):
+        with self.cond:
+            return max(0, self.max_queued - self.policy.queued_for(chainId))
+
+    def submit(self, sessions):
+        now = time.monotonic()
+        with self.cond:
+            for session in sessions:
+                self.policy.push(session, now)
+            self.cond.notify_all()
+
+    def metrics(self):
+        now = time.monotonic()
+        with self.cond:
+            elapsed = now - self.last_metrics_at
+            finalized = self.finalized - self.finalized_at_last_metrics
+            self.finalized_at_last_metrics = self.finalized
+            self.last_metrics_at = now
+            oldest_queued_at = self.policy.oldest_queued_at()
+            return {
+                "queued": len(self.policy),
+                "oldestQueuedFor": f"{now - oldest_queued_at:.1f}s"
+                if oldest_queued_at is not None
+                else "0s",
+                "finalizedPerMinute": round(finalized * 60 / elapsed) if elapsed else 0,
+                "finalized": self.finalized,
+            }
+
+    def __take(self):
+        # blocks until there is work the policy lets through; the timeout keeps the
+        # metrics log going while idle
+        with self.cond:
+            now = time.monotonic()
+            sessions = self.policy.take(self.batch_size, now)
+            if not sessions:
+                wait_hint = self.policy.wait_hint(now)
+                self.cond.wait(
+                    timeout=min(wait_hint, self.metrics_interval)
+                    if wait_hint is not None
+                    else self.metrics_interval
+                )
+                sessions = self.policy.take(self.batch_size, time.monotonic())
+            return sessions
+
+    def __log_metrics(self):
+        metrics = " ".join(f"{k}={v}" for k, v in self.metrics().items())
+        self.logger.info(f"Lane {self.kind} {metrics}")
+        with self.cond:
+            lags = self.policy.lag_metrics()
+        for chainId, (count, mean_lag, max_lag) in lags.items():
+            self.logger.info(
+                f"Lane {self.kind} chainId={chainId} finalized={count}"
+                f" deadlineLagBlocks mean={mean_lag:.1f} max={max_lag}"
+            )
+
+    def run(self) -> None:
+        while True:
+            sessions = self.__take()
+            if sessions:
+                self.logger.info(
+                    f"Finalizing {len(sessions)} {self.kind} proof-sessions..."
+                )
+                try:
+                    finalized = self.send(sessions)
+                except Exception as ex:
+                    self.logger.critical("".join(traceback.format_exception(ex)))
+                    finalized = []
+                with self.cond:
+                    self.finalized += len(finalized)
+                    self.policy.record_finalized(finalized, self.heads.head)
+                self.logger.info(
+                    f"Finalized {len(finalized)} {self.kind} proof-sessions"
+                )
+                if self.on_room is not None:
+                    self.on_room()
+            if time.monotonic() - self.last_metrics_at > self.metrics_interval:
+                self.__log_metrics()
@@ -0,0 +1,133 @@
+import time
+
+from sessionregistry import SessionRegistry
+
+
+class FinalizationRequest:
+    __slots__ = (
+        "deadline",
+        "chainId",
+        "blockHeight",
+        "block_id",
+        "finalized_time",
+        "refinalizations",
+    )
+    # set by each subclass to the registry of its kind of session
+    registry = None
+
+    @classmethod
+    def pop_requests_ready_to_be_finalized(
+        cls, observer_chain_block_height, limit=None
+    ) -> []:
+        # limit, if given, maps a chainId to how many of its sessions may be popped
+        return cls.registry.pop_ready(observer_chain_block_height, limit)
+
+    @classmethod
+    def limit_requests_to_be_finalized(cls, capacity):
+        cls.registry.capacity = capacity
+
+    @classmethod
+    def wait_for_room_to_be_finalized(cls, timeout=None) -> bool:
+        return cls.registry.wait_for_room(timeout)
+
+    @classmethod
+    def on_requests_due(cls, callback):
+        cls.registry.on_due = callback
+
+    @classmethod
+    def pop_requests_unconfirmed_since(cls, finalized_before, limit) -> []:
+        return cls.registry.pop_unconfirmed(finalized_before, limit)
+
+    @classmethod
+    def count_requests_to_be_finalized(cls) -> int:
+        return cls.registry.count(SessionRegistry.TO_BE_FINALIZED)
+
+    @classmethod
+    def oldest_outstanding_block_id(cls):
+        return cls.registry.oldest_outstanding_block_id()
+
+    @classmethod
+    def is_waiting_for_confirm(cls, chainId, blockHeight) -> bool:
+        return cls.registry.contains(
+            SessionRegistry.TO_BE_CONFIRMED, chainId, blockHeight
+        )
+
+    @classmethod
+    def is_waiting_for_finalize(cls, chainId, blockHeight) -> bool:
+        return cls.registry.contains(
+            SessionRegistry.TO_BE_FINALIZED, chainId, blockHeight
+        )
+
+    @classmethod
+    def lookup_request_to_be_confirmed(cls, chainId, blockHeight):
+        return cls.registry.lookup(
+            SessionRegistry.TO_BE_CONFIRMED, chainId, blockHeight
+        )
+
+    @classmethod
+    def discard_request_to_be_finalized(cls, chainId, blockHeight) -> bool:
+        return (
+            cls.registry.remove(SessionRegistry.TO_BE_FINALIZED, chainId, blockHeight)
+            is not None
+        )
+
+    @classmethod
+    def memory_footprint(cls):
+        return cls.registry.memory_footprint()
+
+    def __init__(self, chainId, blockHeight, deadline, block_id):
+        self.deadline = deadline
+        self.chainId = chainId
+        self.blockHeight = blockHeight
+        self.block_id = block_id
+        self.finalized_time = None
+        self.refinalizations = 0
+
+    @property
+    def session_started_block_id(self):
+        return self.block_id
+
+    def confirm_request(self):
+        return (
+            self.registry.remove(
+                SessionRegistry.TO_BE_CONFIRMED, self.chainId, self.blockHeight
+            )
+            is not None
+        )
+
+    def finalize_later(self):
+        return self.registry.add(SessionRegistry.TO_BE_FINALIZED, self)
+
+    def mark_finalized(self):
+        # a finalization tx was sent; wait for the DB to report it
+        self.finalized_time = time.time()
+        self.registry.transition(
+            self, SessionRegistry.TO_BE_FINALIZED, SessionRegistry.TO_BE_CONFIRMED
+        )
+
+    def finalize_again(self):
+        # the finalization tx failed on-chain; re-entering the state also re-enters the
+        # deadline queue, so the session is retried on the next observer block
+        return self.registry.transition(
+            self, SessionRegistry.TO_BE_CONFIRMED, SessionRegistry.TO_BE_FINALIZED
+        )
+
+    def refinalize(self):
+        # the finalization was never confirmed, e.g. its tx got dropped; like
+        # finalize_again, but counted against the refinalization cap
+        if not self.finalize_again():
+            return False
+        self.refinalizations += 1
+        return True
+
+    def abandon(self):
+        # drops a session given up on from the registry, so it neither leaks nor holds the
+        # resume position back
+        for state in SessionRegistry.STATES:
+            if self.registry.remove(state, self.chainId, self.blockHeight) is not None:
+                return True
+        return False
+
+    def schedule(self):
+        # re-enter the deadline queue, e.g. after a failed finalization attempt
+        self.registry.reschedule(self)
@@ -7,80 +7,106 @@ import logformat
 from finalizationspecimenrequest import FinalizationSpecimenRequest
 from finalizationresultrequest import FinalizationResultRequest
 from contract import ProofChainContract
+from finalizationlane import FinalizationLane
+from headtracker import HeadTracker
+from schedulingpolicy import SchedulingPolicy
 
 
 class Finalizer(threading.Thread):
-    def __init__(self, cn: ProofChainContract):
+    def __init__(
+        self,
+        cn: ProofChainContract,
+        heads: HeadTracker,
+        specimen_batch_size=64,
+        result_batch_size=64,
+        scheduling=SchedulingPolicy.ODF,
+        chain_weights=None,
+        chain_rate_caps=None,
+        confirmation_timeout=600,
+        max_refinalizations=3,
+        refinalize_batch_size=256,
+        max_queued=1024,
+    ):
         super().__init__()
         self.contract = cn
+        self.heads = heads
         self.logger = logformat.get_logger("Finalizer")
         self.observer_chain_block_height = 0
-
-    def wait_for_next_observer_chain_block(self):
-        while True:
-            try:
-                bn = self.contract.block_number()
-                if bn > self.observer_chain_block_height:
-                    self.observer_chain_block_height = bn
-                    return
-                time.sleep(4.0)
-            except Exception as ex:
-                self.logger.critical("".join(traceback.format_exception(ex)))
-                time.sleep(4.0)
-
-    def __main_loop(self):
-        self.wait_for_next_observer_chain_block()
-        # self.refinalize_rejected_specimen_requests()
-        # self.refinalize_rejected_result_requests()
-
-        ready_to_specimen_finalize = []
-        open_specimen_session_count = 0
-
-        ready_to_result_finalize = []
-        open_result_session_count = 0
-
-        for frs in FinalizationSpecimenRequest.get_requests_to_be_finalized():
-            if frs.deadline < self.observer_chain_block_height:
-                ready_to_specimen_finalize.append(frs)
-            else:
-                open_specimen_session_count += 1
-
-        self.logger.info(
-            f"Finalizing {len(ready_to_specimen_finalize)} specimen proof-sessions..."
+        self.confirmation_timeout = confirmation_timeout
+        self.max_refinalizations = max_refinalizations
+        self.refinalize_batch_size = refinalize_batch_size
+        # set by notify_work(), whenever there may be more sessions to hand to the lanes
+        self.cond = threading.Condition()
+        self.woken = True
+        # specimen and result sessions go to different contracts and are sent side by side
+        self.specimen_lane = FinalizationLane(
+            "specimen",
+            self._attempt_to_finalize_specimens,
+            heads,
+            SchedulingPolicy.create(scheduling, chain_weights, chain_rate_caps),
+            specimen_batch_size,
+            max_queued=max_queued,
+            on_room=self.notify_work,
         )
-        for frs in ready_to_specimen_finalize:
-            self._attempt_to_finalize_specimen(frs)
-        self.logger.info(
-            f"Finalized {len(ready_to_specimen_finalize)} specimen proof-sessions"
+        self.result_lane = FinalizationLane(
+            "result",
+            self._attempt_to_finalize_results,
+            heads,
+            SchedulingPolicy.create(scheduling, chain_weights, chain_rate_caps),
+            result_batch_size,
+            max_queued=max_queued,
+            on_room=self.notify_work,
         )
+        self.specimen_lane.daemon = True
+        self.result_lane.daemon = True
+        heads.subscribe(self.notify_work)
+        FinalizationSpecimenRequest.on_requests_due(self.notify_work)
+        FinalizationResultRequest.on_requests_due(self.notify_work)
+
+    def notify_work(self, *args):
+        # a new head, a session that is already due or room in a lane
+        with self.cond:
+            self.woken = True
+            self.cond.notify_all()
+
+    def wait_for_work(self):
+        # returns whether the observer chain moved on since the last time
+        with self.cond:
+            self.cond.wait_for(lambda: self.woken)
+            self.woken = False
+        head = self.heads.head
+        new_block = head > self.observer_chain_block_height
+        self.observer_chain_block_height = head
+        return new_block
 
-        if len(ready_to_specimen_finalize) == 0:
-            self.logger.debug(
-                f"Nothing ready to finalize height={self.observer_chain_block_height} specimen openSessions={open_specimen_session_count}"
-            )
-
-        for frr in FinalizationResultRequest.get_result_requests_to_be_finalized():
-            if frr.deadline < self.observer_chain_block_height:
-                ready_to_result_finalize.append(frr)
-            else:
-                open_result_session_count += 1
-
-        self.logger.info(
-            f"Finalizing {len(ready_to_result_finalize)} result proof-sessions..."
-        )
-        for frr in ready_to_result_finalize:
-            self._attempt_to_finalize_result(frr)
-        self.logger.info(
-            f"Finalized {len(ready_to_result_finalize)} result proof-sessions"
-        )
-
-        if len(ready_to_result_finalize) == 0:
-            self.logger.debug(
-                f"Nothing ready to finalize height={self.observer_chain_block_height} result openSessions={open_result_session_count}"
+    def __main_loop(self):
+        new_block = self.wait_for_work()
+        if new_block:
+            # refinalized sessions are due at once, so they go out with this block's ones
+            self.refinalize_unconfirmed_requests()
+
+        for request_class, lane in (
+            (FinalizationSpecimenRequest, self.specimen_lane),
+            (FinalizationResultRequest, self.result_lane),
+        ):
+            # a chain that fills its share of the lane leaves its due sessions in the
+            # registry, whose capacity in turn holds the DB managers back, while the other
+            # chains' sessions keep going
+            ready = request_class.pop_requests_ready_to_be_finalized(
+                self.observer_chain_block_height, lane.room
             )
-            return
+            if len(ready) == 0:
+                if new_block:
+                    self.logger.debug(
+                        f"Nothing ready to finalize height={self.observer_chain_block_height} {lane.kind} openSessions={request_class.count_requests_to_be_finalized()}"
+                    )
+                continue
+            lane.submit(ready)
 
     def run(self) -> None:
+        self.specimen_lane.start()
+        self.result_lane.start()
+        self.heads.wait_for_head_above(None)
         # we need to avoid recursion in order to avoid stack depth exceeded exception
         while True:
             try:
@@ -89,58 +115,81 @@ class Finalizer(threading.Thread):
                 # this should never happen
                 pass
 
-    def refinalize_rejected_specimen_requests(self):
-        to_send = []
-        for frs in FinalizationSpecimenRequest.get_requests_to_be_confirmed():
-            if frs.finalized_time < time.time() - 600:
-                to_send.append(frs)
-        num_to_send = len(to_send)
-        if num_to_send == 0:
-            return
-        self.logger.info(f"Refinalizing {num_to_send} specimen proof-sessions...")
-        while len(to_send) > 0:
-            i = 0
-            for frs in to_send[:1000]:
-                self._attempt_to_finalize_specimen(frs)
-                i += 1
-            to_send = to_send[1000:]
-            refinalized = num_to_send - len(to_send)
-            self.logger.info(f"Refinalized {refinalized} specimen proof-sessions")
-
-    def refinalize_rejected_result_requests(self):
-        to_send = []
-        for frr in FinalizationResultRequest.get_result_requests_to_be_confirmed():
-            if frr.finalized_time < time.time() - 600:
-                to_send.append(frr)
-        num_to_send = len(to_send)
-        if num_to_send == 0:
-            return
-        self.logger.info(f"Refinalizing {num_to_send} result proof-sessions...")
-        while len(to_send) > 0:
-            i = 0
-            for frr in to_send[:1000]:
-                self._attempt_to_finalize_specimen(frr)
-                i += 1
-            to_send = to_send[1000:]
-            refinalized = num_to_send - len(to_send)
-            self.logger.info(f"Refinalized {refinalized} result proof-sessions")
-
-    def _attempt_to_finalize_specimen(self, frs):
+    def refinalize_unconfirmed_requests(self):
+        # sends sessions whose finalization hasn't been confirmed within the timeout back
+        # through their lane, a bounded batch per observer block and a capped number of
+        # times per session
+        cutoff = time.time() - self.confirmation_timeout
+        for request_class, lane in (
+            (FinalizationSpecimenRequest, self.specimen_lane),
+            (FinalizationResultRequest, self.result_lane),
+        ):
+            refinalized = 0
+            for fr in request_class.pop_requests_unconfirmed_since(
+                cutoff, self.refinalize_batch_size
+            ):
+                if fr.refinalizations >= self.max_refinalizations:
+                    fr.abandon()
+                    self.logger.error(
+                        f"Finalization of {lane.kind} {fr.chainId}/{fr.blockHeight} never confirmed after {fr.refinalizations} refinalizations, giving up"
+                    )
+                elif fr.refinalize():
+                    refinalized += 1
+            if refinalized > 0:
+                self.logger.info(
+                    f"Refinalizing {refinalized} unconfirmed {lane.kind} proof-sessions"
+                )
+
+    def _attempt_to_finalize_specimens(self, frss):
+        # returns the sessions that were sent (or turned out not to need it)
+        sent = []
         try:
-            self.contract.send_specimen_finalize(
-                chainId=int(frs.chainId), blockHeight=int(frs.blockHeight), timeout=200
+            self.contract.send_specimen_finalizations(
+                frss,
+                on_sent=lambda frs: self._mark_finalized(frs, sent),
+                on_receipt=self._on_finalize_receipt,
             )
-            frs.finalize_request()
-            frs.confirm_later()
         except Exception as ex:
             self.logger.critical("".join(traceback.format_exception(ex)))
-
-    def _attempt_to_finalize_result(self, frr):
+        # sessions that weren't sent are still waiting for finalization; try again on the
+        # next observer block (a no-op for the ones already marked finalized)
+        for frs in frss:
+            frs.schedule()
+        return sent
+
+    def _attempt_to_finalize_results(self, frrs):
+        # returns the sessions that were sent (or turned out not to need it)
+        sent = []
         try:
-            self.contract.send_result_finalize(
-                chainId=int(frr.chainId), blockHeight=int(frr.blockHeight), timeout=200
+            self.contract.send_result_finalizations(
+                frrs,
+                on_sent=lambda frr: self._mark_finalized(frr, sent),
+                on_receipt=self._on_finalize_receipt,
             )
-            frr.finalize_request()
-            frr.confirm_later()
         except Exception as ex:
             self.logger.critical("".join(traceback.format_exception(ex)))
+        # sessions that weren't sent are still waiting for finalization; try again on the
+        # next observer block (a no-op for the ones already marked finalized)
+        for frr in frrs:
+            frr.schedule()
+        return sent
+
+    def _mark_finalized(self, fr, sent):
+        fr.mark_finalized()
+        sent.append(fr)
+
+    def _on_finalize_receipt(self, fr, receipt):
+        # called from the receipt tracker; a mined tx leaves the session waiting for the
+        # DB to report the finalization, a reverted one sends it back to be finalized, up
+        # to the same cap as refinalizations since a revert that simulation doesn't catch
+        # (e.g. running out of gas) would burn gas on every retry
+        if receipt is not None and not receipt.succeeded():
+            if fr.refinalizations >= self.max_refinalizations:
+                if fr.abandon():
+                    self.logger.error(
+                        f"Finalization of {fr.chainId}/{fr.blockHeight} reverted after {fr.refinalizations} retries, giving up"
+                    )
+            elif fr.refinalize():
+                self.logger.warning(
+                    f"Finalization of {fr.chainId}/{fr.blockHeight} failed, retrying"
+                )
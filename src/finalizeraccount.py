@@ -0,0 +1,48 @@
+import collections
+import threading
+
+from web3 import Web3
+
+from balanceledger import BalanceLedger
+from nonceallocator import NonceAllocator
+
+
+class FinalizerAccount:
+    def __init__(
+        self,
+        address,
+        private_key,
+        nonces: NonceAllocator,
+        balance_ledger: BalanceLedger,
+    ):
+        self.address = address
+        self.private_key = private_key
+        # every account has its own nonce sequence, so their txs mine independently
+        self.nonces = nonces
+        self.balance_ledger = balance_ledger
+        self.lock = threading.Lock()
+        self.counters = collections.Counter()
+
+    def count(self, metric, n=1):
+        with self.lock:
+            self.counters[metric] += n
+
+    def metrics(self):
+        with self.lock:
+            counters = dict(self.counters)
+        spendable = (
+            self.balance_ledger.spendable()
+            if self.balance_ledger.balance is not None
+            else None
+        )
+        return {
+            "nonce": self.nonces.next_nonce,
+            "inFlight": self.nonces.count(),
+            "spendable": Web3.fromWei(spendable, "ether")
+            if spendable is not None
+            else None,
+            **counters,
+        }
+
+    def __str__(self):
+        return self.address
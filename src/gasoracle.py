@@ -0,0 +1,117 @@
+import threading
+import time
+
+import logformat
+
+
+class GasOracle:
+    LEGACY = "legacy"
+    EIP1559 = "eip1559"
+
+    def __init__(
+        self,
+        mode=LEGACY,
+        ttl=6.0,
+        history_blocks=10,
+        percentile=50,
+        floor=0,
+        max_fee_ceiling=None,
+        priority_fee_ceiling=None,
+        bump=1.15,
+    ):
+        if mode not in (GasOracle.LEGACY, GasOracle.EIP1559):
+            raise ValueError(f"unknown gas pricing mode {mode}")
+        self.mode = mode
+        self.ttl = ttl
+        self.history_blocks = history_blocks
+        self.percentile = percentile
+        self.floor = floor
+        self.max_fee_ceiling = max_fee_ceiling
+        self.priority_fee_ceiling = priority_fee_ceiling
+        self.bump = bump
+
+        self.logger = logformat.get_logger("Contract")
+        self.lock = threading.Lock()
+        self.fees = None
+        self.fetched_at = 0.0
+        self.fetched_for_block = None
+        self.latest_block = None
+
+    def new_block(self, block_number):
+        # one price per observer block: a newer block invalidates the cached fees
+        self.latest_block = block_number
+
+    def stale(self):
+        if self.fees is None or self.fetched_for_block != self.latest_block:
+            return True
+        return time.monotonic() - self.fetched_at > self.ttl
+
+    def requests(self):
+        # the JSON-RPC calls needed to refresh the price, to be merged into a caller's batch
+        if not self.stale():
+            return []
+        if self.mode == GasOracle.LEGACY:
+            return [("eth_gasPrice", [])]
+        return [
+            (
+                "eth_feeHistory",
+                [hex(self.history_blocks), "latest", [self.percentile]],
+            )
+        ]
+
+    def update(self, results):
+        # takes the results of requests(), in order; a no-op when nothing was requested
+        if not results:
+            return
+        for result in results:
+            if isinstance(result, ValueError):
+                raise result
+        if self.mode == GasOracle.LEGACY:
+            fees = {"gasPrice": self.__cap(int(results[0], 16), self.max_fee_ceiling)}
+        else:
+            fees = self.__from_fee_history(results[0])
+        with self.lock:
+            self.fees = fees
+            self.fetched_at = time.monotonic()
+            self.fetched_for_block = self.latest_block
+        self.logger.info(f"TX dynamic gas price is {GasOracle.describe(fees)}")
+
+    def __from_fee_history(self, history):
+        # the base fee of the next block is the last entry; tips are the requested
+        # percentile of each past block's rewards, of which we take the median
+        base_fee = int(history["baseFeePerGas"][-1], 16)
+        tips = sorted(int(r[0], 16) for r in history.get("reward") or [] if r)
+        tip = tips[len(tips) // 2] if tips else 0
+        tip = self.__cap(max(tip, self.floor), self.priority_fee_ceiling)
+        # headroom for the base fee to double before the tx stops being includable
+        max_fee = self.__cap(2 * base_fee + tip, self.max_fee_ceiling)
+        return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": min(tip, max_fee)}
+
+    def __cap(self, value, ceiling):
+        value = max(value, self.floor)
+        if ceiling is not None and value > ceiling:
+            self.logger.warning(f"Gas price {value} capped at ceiling {ceiling}")
+            return ceiling
+        return value
+
+    def current(self):
+        with self.lock:
+            return dict(self.fees)
+
+    def bumped(self, fees):
+        # fees for a replacement tx: nodes require every fee field to rise by at least 10%
+        # over the tx being replaced, and never below what the market asks now
+        current = self.current() if self.fees is not None else {}
+        ceilings = {
+            "gasPrice": self.max_fee_ceiling,
+            "maxFeePerGas": self.max_fee_ceiling,
+            "maxPriorityFeePerGas": self.priority_fee_ceiling,
+        }
+        return {
+            k: self.__cap(max(int(v * self.bump), current.get(k, 0)), ceilings[k])
+            for k, v in fees.items()
+        }
+
+    @staticmethod
+    def describe(fees):
+        return " ".join(f"{k}={v}" for k, v in fees.items())
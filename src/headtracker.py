@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import aiohttp
+
+import logformat
+
+from contract import ProofChainContract
+
+
+class HeadTracker(threading.Thread):
+    # follows the observer chain head, from a newHeads subscription when a websocket
+    # endpoint is configured and by polling eth_blockNumber otherwise (or whenever the
+    # subscription is down), and wakes everyone waiting on it as soon as a block lands
+    def __init__(
+        self,
+        cn: ProofChainContract,
+        ws_endpoint=None,
+        min_poll_interval=0.25,
+        max_poll_interval=4.0,
+        ws_retry_interval=60.0,
+    ):
+        super().__init__()
+        self.contract = cn
+        self.ws_endpoint = ws_endpoint
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.ws_retry_interval = ws_retry_interval
+        self.logger = logformat.get_logger("Heads")
+        self.cond = threading.Condition()
+        self.head = None
+        self.changed_at = None
+        # smoothed seconds per block, learnt from the heads seen so far
+        self.block_time = None
+        self.ws_retry_at = 0.0
+        # called with each new head, for consumers that wait on more than heads alone
+        self.listeners = []
+
+    def wait_for_head_above(self, block_number, timeout=None):
+        # returns the head once it is past block_number, or whatever it is on timeout
+        def above():
+            if self.head is None:
+                return False
+            return block_number is None or self.head > block_number
+
+        with self.cond:
+            self.cond.wait_for(above, timeout=timeout)
+            return self.head
+
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def publish(self, block_number):
+        now = time.monotonic()
+        with self.cond:
+            if self.head is not None and block_number <= self.head:
+                return
+            if self.head is not None:
+                sample = (now - self.changed_at) / (block_number - self.head)
+                self.block_time = (
+                    sample
+                    if self.block_time is None
+                    else 0.8 * self.block_time + 0.2 * sample
+                )
+            self.head = block_number
+            self.changed_at = now
+            self.cond.notify_all()
+        self.contract.new_head(block_number)
+        for listener in self.listeners:
+            listener(block_number)
+
+    def __poll_delay(self):
+        # sleeps until shortly before the next block is due, then polls more eagerly
+        # until it shows up
+        if self.block_time is None:
+            return self.min_poll_interval
+        due_in = self.changed_at + 0.9 * self.block_time - time.monotonic()
+        delay = due_in if due_in > 0 else self.block_time / 10
+        return min(self.max_poll_interval, max(self.min_poll_interval, delay))
+
+    def __poll(self):
+        try:
+            self.publish(self.contract.block_number())
+        except Exception as ex:
+            self.logger.warning(f"Polling the observer chain head failed: {ex!r}")
+            return self.max_poll_interval
+        return self.__poll_delay()
+
+    async def __subscribe(self):
+        # aiohttp rather than the pinned websockets release, which predates Python 3.10
+        async with aiohttp.ClientSession() as session:
+            async with session.ws_connect(self.ws_endpoint, heartbeat=30) as ws:
+                await ws.send_json(
+                    {
+                        "jsonrpc": "2.0",
+                        "id": 1,
+                        "method": "eth_subscribe",
+                        "params": ["newHeads"],
+                    }
+                )
+                reply = await ws.receive_json(timeout=30)
+                if "error" in reply:
+                    raise ValueError(reply["error"])
+                self.logger.info(f"Subscribed to newHeads at {self.ws_endpoint}")
+                while True:
+                    # a subscription that goes quiet for several blocks is as good as dead
+                    message = await ws.receive_json(
+                        timeout=max(30.0, 10 * (self.block_time or 0))
+                    )
+                    self.publish(int(message["params"]["result"]["number"], 16))
+
+    def run(self) -> None:
+        while True:
+            if self.ws_endpoint is not None and time.monotonic() >= self.ws_retry_at:
+                try:
+                    asyncio.run(self.__subscribe())
+                except Exception as ex:
+                    self.logger.warning(
+                        f"newHeads subscription lost, polling instead: {ex!r}"
+                    )
+                self.ws_retry_at = time.monotonic() + self.ws_retry_interval
+            time.sleep(self.__poll())
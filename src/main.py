@@ -4,10 +4,23 @@ import sys
 import os
 
 from dotenv import load_dotenv
+from web3 import Web3
+from dbpool import DBConnectionPool
 from dbmanspecimen import DBManagerSpecimen
 from dbmanresult import DBManagerResult
+from finalizationspecimenrequest import FinalizationSpecimenRequest
+from finalizationresultrequest import FinalizationResultRequest
+from balanceledger import BalanceLedger
 from contract import ProofChainContract
+from finalizeraccount import FinalizerAccount
+from gasoracle import GasOracle
+from headtracker import HeadTracker
+from nonceallocator import NonceAllocator
 from finalizer import Finalizer
+from receipttracker import ReceiptTracker
+from schedulingpolicy import SchedulingPolicy, parse_chain_map
+from ratelimiter import RateLimiter
+from rpcpool import RPCEndpointPool
 
 
 def is_any_thread_alive(threads):
@@ -17,58 +30,170 @@ def is_any_thread_alive(threads):
 if __name__ == "__main__":
     load_dotenv()
 
-    BLOCK_ID_START = os.getenv("BLOCK_ID_START", "-1")
+    BLOCK_ID_START = os.getenv("BLOCK_ID_START") or "-1"
     BSP_PROOFCHAIN_ADDRESS = os.getenv("BSP_PROOFCHAIN_ADDRESS")
     BRP_PROOFCHAIN_ADDRESS = os.getenv("BRP_PROOFCHAIN_ADDRESS")
+    # comma-separated to finalize from several accounts, addresses in the same order as keys
     FINALIZER_PRIVATE_KEY = os.getenv("FINALIZER_PRIVATE_KEY")
     FINALIZER_ADDRESS = os.getenv("FINALIZER_ADDRESS")
+    FINALIZER_KEY_ROUTING = (
+        os.getenv("FINALIZER_KEY_ROUTING") or ProofChainContract.ROUND_ROBIN
+    )
+    # comma-separated to spread reads and broadcast txs over several nodes
     RPC_ENDPOINT = os.getenv("RPC_ENDPOINT")
+    RPC_BROADCAST_FANOUT = int(os.getenv("RPC_BROADCAST_FANOUT") or "3")
+    RPC_MAX_HEAD_LAG = int(os.getenv("RPC_MAX_HEAD_LAG") or "3")
+    RPC_PROBE_INTERVAL = float(os.getenv("RPC_PROBE_INTERVAL") or "5")
+    RPC_EJECT_FOR = float(os.getenv("RPC_EJECT_FOR") or "30")
+    # optional websocket endpoint of the same chain, for newHeads instead of polling
+    RPC_WS_ENDPOINT = os.getenv("RPC_WS_ENDPOINT") or None
+    RPC_RATE_LIMIT = float(os.getenv("RPC_RATE_LIMIT") or "0")
+    RPC_RATE_BURST = os.getenv("RPC_RATE_BURST")
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
     DB_HOST = os.getenv("DB_HOST")
     DB_DATABASE = os.getenv("DB_DATABASE")
     CHAIN_TABLE_NAME = os.getenv("CHAIN_TABLE_NAME")
+    DB_FETCH_CHUNK_SIZE = int(os.getenv("DB_FETCH_CHUNK_SIZE") or "10000")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE") or "2")
+    DB_LISTEN_CHANNEL = os.getenv("DB_LISTEN_CHANNEL")
+    PROOF_CHAIN_SOURCE = os.getenv("PROOF_CHAIN_SOURCE") or "view"
+    MAX_IN_FLIGHT_TXS = int(os.getenv("MAX_IN_FLIGHT_TXS") or "16")
+    GAS_PRICE = os.getenv("GAS_PRICE") or "0"
+    GAS_PRICING = os.getenv("GAS_PRICING") or GasOracle.LEGACY
+    GAS_PRICE_CEILING = os.getenv("GAS_PRICE_CEILING")
+    GAS_PRIORITY_FEE_CEILING = os.getenv("GAS_PRIORITY_FEE_CEILING")
+    GAS_FEE_PERCENTILE = int(os.getenv("GAS_FEE_PERCENTILE") or "50")
+    GAS_PRICE_TTL = float(os.getenv("GAS_PRICE_TTL") or "6")
+    LOW_BALANCE_THRESHOLD = os.getenv("LOW_BALANCE_THRESHOLD") or "0"
+    BALANCE_REFRESH_INTERVAL = float(os.getenv("BALANCE_REFRESH_INTERVAL") or "60")
+    SPECIMEN_LANE_BATCH_SIZE = int(os.getenv("SPECIMEN_LANE_BATCH_SIZE") or "64")
+    RESULT_LANE_BATCH_SIZE = int(os.getenv("RESULT_LANE_BATCH_SIZE") or "64")
+    FINALIZER_SCHEDULING = os.getenv("FINALIZER_SCHEDULING") or SchedulingPolicy.ODF
+    FINALIZER_CHAIN_WEIGHTS = parse_chain_map(os.getenv("FINALIZER_CHAIN_WEIGHTS"))
+    FINALIZER_CHAIN_RATE_CAPS = parse_chain_map(os.getenv("FINALIZER_CHAIN_RATE_CAPS"))
+    CONFIRMATION_TIMEOUT = float(os.getenv("CONFIRMATION_TIMEOUT") or "600")
+    MAX_REFINALIZATIONS = int(os.getenv("MAX_REFINALIZATIONS") or "3")
+    REFINALIZE_BATCH_SIZE = int(os.getenv("REFINALIZE_BATCH_SIZE") or "256")
+    MAX_PENDING_SESSIONS = int(os.getenv("MAX_PENDING_SESSIONS") or "200000")
+    LANE_MAX_QUEUED = int(os.getenv("LANE_MAX_QUEUED") or "1024")
+    SIMULATE_FINALIZATIONS = (os.getenv("SIMULATE_FINALIZATIONS") or "true") == "true"
 
     logging.basicConfig(
         stream=sys.stdout,
         format="%(levelname)s %(name)s (%(filename)s:%(lineno)d) - %(message)s",
         level=logging.INFO,
     )
+    gas_oracle = GasOracle(
+        mode=GAS_PRICING,
+        ttl=GAS_PRICE_TTL,
+        percentile=GAS_FEE_PERCENTILE,
+        floor=Web3.toWei(GAS_PRICE, "gwei"),
+        max_fee_ceiling=Web3.toWei(GAS_PRICE_CEILING, "gwei")
+        if GAS_PRICE_CEILING
+        else None,
+        priority_fee_ceiling=Web3.toWei(GAS_PRIORITY_FEE_CEILING, "gwei")
+        if GAS_PRIORITY_FEE_CEILING
+        else None,
+    )
+    finalizer_keys = FINALIZER_PRIVATE_KEY.split(",")
+    finalizer_addresses = FINALIZER_ADDRESS.split(",")
+    if len(finalizer_keys) != len(finalizer_addresses):
+        sys.exit("FINALIZER_PRIVATE_KEY and FINALIZER_ADDRESS list different accounts")
+    finalizer_accounts = [
+        FinalizerAccount(
+            address.strip(),
+            key.strip(),
+            nonces=NonceAllocator(MAX_IN_FLIGHT_TXS),
+            balance_ledger=BalanceLedger(
+                address.strip(),
+                low_balance_threshold=Web3.toWei(LOW_BALANCE_THRESHOLD, "ether"),
+                refresh_interval=BALANCE_REFRESH_INTERVAL,
+            ),
+        )
+        for address, key in zip(finalizer_addresses, finalizer_keys)
+    ]
+    rpc_pool = RPCEndpointPool(
+        [uri.strip() for uri in RPC_ENDPOINT.split(",")],
+        broadcast_fanout=RPC_BROADCAST_FANOUT,
+        max_head_lag=RPC_MAX_HEAD_LAG,
+        probe_interval=RPC_PROBE_INTERVAL,
+        eject_for=RPC_EJECT_FOR,
+        limiter=RateLimiter(
+            rate=RPC_RATE_LIMIT,
+            burst=float(RPC_RATE_BURST) if RPC_RATE_BURST else None,
+        ),
+    )
+    rpc_pool.start()
     contract = ProofChainContract(
-        rpc_endpoint=RPC_ENDPOINT,
-        finalizer_address=FINALIZER_ADDRESS,
-        finalizer_prvkey=FINALIZER_PRIVATE_KEY,
+        provider=rpc_pool,
+        accounts=finalizer_accounts,
         bsp_proofchain_address=BSP_PROOFCHAIN_ADDRESS,
         brp_proofchain_address=BRP_PROOFCHAIN_ADDRESS,
+        gas_oracle=gas_oracle,
+        routing=FINALIZER_KEY_ROUTING,
+        simulate=SIMULATE_FINALIZATIONS,
     )
-    dbms = DBManagerSpecimen(
-        starting_point=int(BLOCK_ID_START),
+    db_pool = DBConnectionPool(
         user=DB_USER,
         password=DB_PASSWORD,
         database=DB_DATABASE,
         host=DB_HOST,
+        size=DB_POOL_SIZE,
+    )
+    # ingestion waits for the finalizer once either kind holds this many sessions
+    if MAX_PENDING_SESSIONS > 0:
+        FinalizationSpecimenRequest.limit_requests_to_be_finalized(MAX_PENDING_SESSIONS)
+        FinalizationResultRequest.limit_requests_to_be_finalized(MAX_PENDING_SESSIONS)
+
+    dbms = DBManagerSpecimen(
+        pool=db_pool,
+        starting_point=int(BLOCK_ID_START),
         chain_table=CHAIN_TABLE_NAME,
+        chunk_size=DB_FETCH_CHUNK_SIZE,
+        listen_channel=DB_LISTEN_CHANNEL,
+        source=PROOF_CHAIN_SOURCE,
     )
 
     dbms.daemon = True
 
     dbmr = DBManagerResult(
+        pool=db_pool,
         starting_point=int(BLOCK_ID_START),
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_DATABASE,
-        host=DB_HOST,
         chain_table=CHAIN_TABLE_NAME,
+        chunk_size=DB_FETCH_CHUNK_SIZE,
+        listen_channel=DB_LISTEN_CHANNEL,
+        source=PROOF_CHAIN_SOURCE,
     )
 
     dbmr.daemon = True
 
-    finalizer = Finalizer(contract)
+    heads = HeadTracker(contract, ws_endpoint=RPC_WS_ENDPOINT)
+    heads.daemon = True
+
+    finalizer = Finalizer(
+        contract,
+        heads,
+        specimen_batch_size=SPECIMEN_LANE_BATCH_SIZE,
+        result_batch_size=RESULT_LANE_BATCH_SIZE,
+        scheduling=FINALIZER_SCHEDULING,
+        chain_weights=FINALIZER_CHAIN_WEIGHTS,
+        chain_rate_caps=FINALIZER_CHAIN_RATE_CAPS,
+        confirmation_timeout=CONFIRMATION_TIMEOUT,
+        max_refinalizations=MAX_REFINALIZATIONS,
+        refinalize_batch_size=REFINALIZE_BATCH_SIZE,
+        max_queued=LANE_MAX_QUEUED,
+    )
     finalizer.daemon = True
 
+    receipt_tracker = ReceiptTracker(contract, heads)
+    receipt_tracker.daemon = True
+
+    heads.start()
     dbms.start()
     dbmr.start()
     finalizer.start()
+    receipt_tracker.start()
 
-    while is_any_thread_alive([finalizer, dbmr, dbms]):
+    while is_any_thread_alive([heads, finalizer, receipt_tracker, dbmr, dbms]):
         time.sleep(0.3)
@@ -0,0 +1,184 @@
+import collections
+import contextlib
+import threading
+import time
+
+
+class InFlightTx:
+    FILLER = "filler"
+
+    __slots__ = (
+        "nonce",
+        "tx_hash",
+        "raw_tx",
+        "kind",
+        "chainId",
+        "blockHeight",
+        "fees",
+        "sent_at",
+        "replaced_hashes",
+        "on_receipt",
+    )
+
+    def __init__(
+        self,
+        nonce,
+        tx_hash,
+        raw_tx,
+        kind,
+        chainId,
+        blockHeight,
+        fees,
+        on_receipt=None,
+        replaced_hashes=(),
+    ):
+        self.nonce = nonce
+        self.tx_hash = tx_hash
+        self.raw_tx = raw_tx
+        self.kind = kind
+        self.chainId = chainId
+        self.blockHeight = blockHeight
+        # the gasPrice or maxFeePerGas/maxPriorityFeePerGas fields it was signed with
+        self.fees = fees
+        self.sent_at = time.time()
+        # earlier broadcasts of the same nonce, any of which may still be the one mined
+        self.replaced_hashes = replaced_hashes
+        self.on_receipt = on_receipt
+
+    def hashes(self):
+        return (self.tx_hash,) + self.replaced_hashes
+
+    def __str__(self):
+        session = (
+            ""
+            if self.kind == InFlightTx.FILLER
+            else f" {self.chainId}/{self.blockHeight}"
+        )
+        return (
+            f"{self.kind}{session}"
+            f" txNonce={self.nonce}"
+            f" txHash=0x{self.tx_hash.hex()}"
+        )
+
+
+class NonceAllocator:
+    def __init__(self, window):
+        self.window = window
+        self.next_nonce = None
+        # nonce -> InFlightTx for every tx sent but not yet mined
+        self.in_flight = {}
+        # nonces below next_nonce that were handed out but not used, e.g. because the node
+        # rejected that tx while accepting later ones; nothing above a hole can be mined
+        self.holes = set()
+        self.cond = threading.Condition(threading.RLock())
+        # kind -> senders with sessions to send from this account
+        self.contenders = collections.Counter()
+        # when the window last filled up, None while it has room
+        self.full_since = None
+
+    def sync(self, chain_nonce):
+        # catch up with the account's nonce as reported by the chain, e.g. after "nonce too
+        # low"; never moves backwards, dropped in-flight txs are re-sent rather than reused
+        with self.cond:
+            if self.next_nonce is None or chain_nonce > self.next_nonce:
+                self.next_nonce = chain_nonce
+            self.holes = {n for n in self.holes if n >= chain_nonce}
+
+    @contextlib.contextmanager
+    def contending(self, kind=None):
+        # marks a sender of this kind as wanting room in the window while it sends
+        with self.cond:
+            self.contenders[kind] += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.contenders[kind] -= 1
+
+    def __track_full(self):
+        if len(self.in_flight) < self.window:
+            self.full_since = None
+        elif self.full_since is None:
+            self.full_since = time.monotonic()
+
+    def full_for(self):
+        # seconds the window has been full for, 0 while it has room
+        with self.cond:
+            if self.full_since is None:
+                return 0.0
+            return time.monotonic() - self.full_since
+
+    def room(self, kind=None, timeout=0):
+        # how many txs the caller may send now, 0 if the window is still full after
+        # timeout seconds, so a stuck tx holds up the caller for a bounded time at most.
+        # While senders of other kinds are contending too, the room is split between them
+        with self.cond:
+            self.cond.wait_for(
+                lambda: len(self.in_flight) < self.window, timeout=timeout
+            )
+            free = self.window - len(self.in_flight)
+            if free <= 0:
+                return 0
+            others = sum(1 for k, n in self.contenders.items() if n and k != kind)
+            return max(1, free // (1 + others))
+
+    @contextlib.contextmanager
+    def reserve(self, count=1):
+        # holds the allocator for the duration of one sign+send round and yields up to count
+        # nonces, holes first, fewer (or none) if the window has filled up since room(); a
+        # nonce is only consumed once the caller commits a tx with it
+        with self.cond:
+            count = max(0, min(count, self.window - len(self.in_flight)))
+            nonces = sorted(self.holes)[:count]
+            yield nonces + list(
+                range(self.next_nonce, self.next_nonce + count - len(nonces))
+            )
+
+    def commit(self, tx):
+        with self.cond:
+            self.in_flight[tx.nonce] = tx
+            self.__track_full()
+            if tx.nonce in self.holes:
+                self.holes.discard(tx.nonce)
+            elif tx.nonce >= self.next_nonce:
+                self.holes.update(range(self.next_nonce, tx.nonce))
+                self.next_nonce = tx.nonce + 1
+
+    def settle(self, confirmed_nonce):
+        # every tx below the account's mined nonce is settled, one way or another
+        with self.cond:
+            settled = [
+                self.in_flight.pop(n)
+                for n in sorted(self.in_flight)
+                if n < confirmed_nonce
+            ]
+            self.holes = {n for n in self.holes if n >= confirmed_nonce}
+            self.__track_full()
+            if settled:
+                self.cond.notify_all()
+            return settled
+
+    def settle_nonce(self, nonce):
+        with self.cond:
+            tx = self.in_flight.pop(nonce, None)
+            self.__track_full()
+            if tx is not None:
+                self.cond.notify_all()
+            return tx
+
+    def pending(self):
+        with self.cond:
+            return [self.in_flight[n] for n in sorted(self.in_flight)]
+
+    def lowest_hole(self):
+        with self.cond:
+            return min(self.holes, default=None)
+
+    def oldest(self):
+        with self.cond:
+            if not self.in_flight:
+                return None
+            return self.in_flight[min(self.in_flight)]
+
+    def count(self):
+        return len(self.in_flight)
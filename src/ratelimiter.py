@@ -0,0 +1,139 @@
+import collections
+import threading
+import time
+
+import requests
+
+import logformat
+
+
+class RateLimiter:
+    # a token bucket shared by every thread talking to the RPC, with a circuit breaker
+    # that holds all of them back while the provider is failing instead of letting each
+    # one retry on its own
+    SEND = "send"
+    READ = "read"
+
+    def __init__(
+        self,
+        rate=0.0,
+        burst=None,
+        failure_threshold=5,
+        min_cooldown=1.0,
+        max_cooldown=16.0,
+    ):
+        # rate is in JSON-RPC calls per second, 0 for no limit; it is halved whenever the
+        # provider answers 429 and creeps back up as calls succeed
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.tokens = self.burst
+        self.refilled_at = time.monotonic()
+        self.failure_threshold = failure_threshold
+        self.min_cooldown = min_cooldown
+        self.max_cooldown = max_cooldown
+
+        self.logger = logformat.get_logger("RPC")
+        self.cond = threading.Condition()
+        self.waiting = {RateLimiter.SEND: 0, RateLimiter.READ: 0}
+        self.failures = 0
+        self.cooldown = min_cooldown
+        self.open_until = 0.0
+        # set while the one request let through after a cooldown is out
+        self.probing = False
+        self.stats = collections.Counter()
+
+    def __refill(self, now):
+        if self.rate:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.refilled_at) * self.rate
+            )
+        self.refilled_at = now
+
+    def __wait_time(self, priority, now):
+        # how long the caller must wait before it may go, 0 if it may go now; None
+        # means until someone else's request completes
+        if now < self.open_until:
+            return self.open_until - now
+        if self.failures >= self.failure_threshold and self.probing:
+            return None
+        if priority == RateLimiter.READ and self.waiting[RateLimiter.SEND]:
+            return None
+        if self.rate and self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    def acquire(self, priority, cost=1):
+        # blocks until the caller may send a request made of cost JSON-RPC calls; a batch
+        # larger than the bucket goes through as soon as there is a token, leaving a debt
+        # that later callers wait out
+        started = time.monotonic()
+        with self.cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.__refill(now)
+                    wait_time = self.__wait_time(priority, now)
+                    if wait_time == 0:
+                        break
+                    self.cond.wait(timeout=wait_time)
+            finally:
+                self.waiting[priority] -= 1
+            if self.failures >= self.failure_threshold:
+                self.probing = True
+            if self.rate:
+                self.tokens -= cost
+            self.stats[f"{priority}Requests"] += 1
+            self.stats[f"{priority}Calls"] += cost
+            self.stats[f"{priority}WaitMs"] += int((time.monotonic() - started) * 1000)
+            self.cond.notify_all()
+
+    def succeeded(self):
+        with self.cond:
+            if self.failures >= self.failure_threshold:
+                self.logger.info("RPC circuit closed")
+            self.failures = 0
+            self.cooldown = self.min_cooldown
+            self.probing = False
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+            self.cond.notify_all()
+
+    def failed(self, ex):
+        retry_after = None
+        if isinstance(ex, requests.HTTPError) and ex.response is not None:
+            if ex.response.status_code == 429:
+                kind = "throttled"
+                retry_after = ex.response.headers.get("Retry-After")
+            else:
+                kind = "httpErrors"
+        elif isinstance(ex, requests.Timeout):
+            kind = "timeouts"
+        else:
+            kind = "errors"
+
+        with self.cond:
+            self.stats[kind] += 1
+            self.failures += 1
+            self.probing = False
+            if kind == "throttled" and self.max_rate:
+                self.rate = max(self.max_rate / 16, self.rate / 2)
+            pause = None
+            if retry_after is not None and retry_after.isdigit():
+                pause = min(float(retry_after), self.max_cooldown)
+            if self.failures >= self.failure_threshold:
+                pause = max(pause or 0, self.cooldown)
+                self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            if pause is not None:
+                self.open_until = max(self.open_until, time.monotonic() + pause)
+                self.stats["circuitOpened"] += 1
+                self.logger.warning(
+                    f"RPC circuit open for {pause:.1f}s"
+                    f" after {self.failures} failed requests: {ex!r}"
+                )
+            self.cond.notify_all()
+
+    def metrics(self):
+        with self.cond:
+            return {"rate": round(self.rate, 1), **self.stats}
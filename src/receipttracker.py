@@ -0,0 +1,143 @@
+import threading
+import time
+import traceback
+
+from web3._utils.method_formatters import receipt_formatter
+
+import logformat
+
+from contract import LoggableReceipt, ProofChainContract
+from headtracker import HeadTracker
+from rpcbatch import RPCBatch
+
+
+class ReceiptTracker(threading.Thread):
+    def __init__(
+        self,
+        cn: ProofChainContract,
+        heads: HeadTracker,
+        poll_interval=2.0,
+        resend_after=60,
+        replace_after=200,
+        metrics_interval=60,
+    ):
+        super().__init__()
+        self.contract = cn
+        self.heads = heads
+        self.poll_interval = poll_interval
+        self.resend_after = resend_after
+        self.replace_after = replace_after
+        self.metrics_interval = metrics_interval
+        self.logger = logformat.get_logger("Receipts")
+        self.last_block_number = None
+        self.last_metrics_at = time.monotonic()
+        # account -> (nonce, since, resent) for the lowest pending nonce of that account,
+        # i.e. the one holding up the rest of its txs
+        self.stalled = {}
+
+    def reconcile(self):
+        # one batched request per new block covers every tx still in flight on every
+        # account, plus the balances of those whose ledger is due for a refresh
+        pending = {a: a.nonces.pending() for a in self.contract.accounts}
+        balance_requests = {
+            a: a.balance_ledger.requests() for a in self.contract.accounts
+        }
+        for account, txs in pending.items():
+            if not txs:
+                self.stalled.pop(account, None)
+        due = any(balance_requests.values())
+        if not any(pending.values()) and not due:
+            return
+        block_number = self.heads.head
+        if block_number == self.last_block_number and not due:
+            return
+        self.last_block_number = block_number
+
+        batch = RPCBatch(self.contract.provider)
+        balance_calls = {
+            a: [batch.add(m, p) for m, p in requests]
+            for a, requests in balance_requests.items()
+        }
+        mined_nonce_calls = {
+            a: batch.add("eth_getTransactionCount", [a.address, "latest"])
+            for a, txs in pending.items()
+            if txs
+        }
+        receipt_calls = [
+            (a, tx, batch.add("eth_getTransactionReceipt", ["0x" + h.hex()]))
+            for a, txs in pending.items()
+            for tx in txs
+            for h in tx.hashes()
+        ]
+        results = batch.execute()
+
+        for account, calls in balance_calls.items():
+            account.balance_ledger.update([results[i] for i in calls], block_number)
+
+        self.__settle_receipts(receipt_calls, results)
+        self.__settle_mined_nonces(pending, mined_nonce_calls, results)
+
+    def __settle_receipts(self, receipt_calls, results):
+        for account, tx, call in receipt_calls:
+            fields = results[call]
+            if isinstance(fields, ValueError):
+                self.logger.warning(f"Receipt lookup for {tx} failed: {fields}")
+            elif fields is not None and account.nonces.settle_nonce(tx.nonce):
+                self.contract.report_transaction_receipt(
+                    account, tx, LoggableReceipt(receipt_formatter(fields))
+                )
+
+    def __settle_mined_nonces(self, pending, mined_nonce_calls, results):
+        for account, call in mined_nonce_calls.items():
+            mined_nonce = results[call]
+            if isinstance(mined_nonce, ValueError):
+                raise mined_nonce
+            # nonces mined under a hash we don't know about, e.g. a replacement raced its
+            # original; txs sent since the batch was assembled wait for their receipts
+            confirmed = min(int(mined_nonce, 16), pending[account][-1].nonce + 1)
+            for tx in account.nonces.settle(confirmed):
+                self.contract.report_transaction_receipt(account, tx, None)
+            self.__unstick(account)
+
+    def __unstick(self, account):
+        # whatever holds up the lowest pending nonce: a hole no tx was sent for, or a tx
+        # the node is sitting on
+        tx = account.nonces.oldest()
+        hole = account.nonces.lowest_hole()
+        if hole is not None and (tx is None or hole < tx.nonce):
+            stalled_nonce = hole
+        elif tx is not None:
+            stalled_nonce = tx.nonce
+        else:
+            self.stalled.pop(account, None)
+            return
+        nonce, since, resent = self.stalled.get(account, (None, None, False))
+        if nonce != stalled_nonce:
+            self.stalled[account] = (stalled_nonce, time.time(), False)
+            return
+
+        stalled_for = time.time() - since
+        if stalled_nonce == hole:
+            if stalled_for > self.resend_after:
+                self.contract.fill_nonce(account, hole)
+        elif stalled_for > self.replace_after:
+            self.contract.replace_transaction(account, tx)
+            self.stalled[account] = (tx.nonce, time.time(), False)
+        elif stalled_for > self.resend_after and not resent:
+            self.contract.resend_transaction(account, tx)
+            self.stalled[account] = (tx.nonce, since, True)
+
+    def run(self) -> None:
+        while True:
+            head = self.heads.head
+            try:
+                self.reconcile()
+            except Exception as ex:
+                self.logger.critical("".join(traceback.format_exception(ex)))
+            if time.monotonic() - self.last_metrics_at > self.metrics_interval:
+                self.last_metrics_at = time.monotonic()
+                self.contract.log_account_metrics()
+                self.contract.log_rpc_metrics()
+            # receipts can only change with a new block; the timeout keeps the stall
+            # timers and balance refreshes going if none comes
+            self.heads.wait_for_head_above(head, timeout=self.poll_interval)
@@ -0,0 +1,40 @@
+from rpcpool import RPCEndpointPool
+
+
+class RPCBatch:
+    def __init__(self, provider: RPCEndpointPool):
+        self.provider = provider
+        self.calls = []
+
+    def add(self, method, params):
+        # returns the position of the call's result in execute()
+        self.calls.append((method, params))
+        return len(self.calls) - 1
+
+    def execute(self):
+        # sends every queued call in one HTTP request; a failed call's slot holds the
+        # ValueError web3 would have raised for it, so callers decide what is fatal
+        if not self.calls:
+            return []
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(self.calls)
+        ]
+        responses = self.provider.request(payload)
+        if not isinstance(responses, list):
+            # the endpoint rejected the batch as a whole
+            raise ValueError(responses.get("error", responses))
+
+        ids = range(len(self.calls))
+        results = [ValueError({"message": "missing from batch response"})] * len(ids)
+        # responses may come back in any order; ones that match no call are ignored, the
+        # calls may have been sent already
+        for response in responses:
+            if not isinstance(response, dict) or response.get("id") not in ids:
+                continue
+            if "error" in response:
+                results[response["id"]] = ValueError(response["error"])
+            else:
+                results[response["id"]] = response.get("result")
+        self.calls = []
+        return results
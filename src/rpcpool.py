@@ -0,0 +1,264 @@
+import concurrent.futures
+import itertools
+import json
+import threading
+import time
+
+import requests
+from web3.providers.base import BaseProvider
+from web3._utils.request import make_post_request
+
+import logformat
+
+from ratelimiter import RateLimiter
+
+
+class RPCNode:
+    def __init__(self, uri):
+        self.uri = uri
+        # smoothed round trip of eth_blockNumber probes, None until the first one answers
+        self.latency = None
+        self.head = None
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def ejected(self):
+        return time.monotonic() < self.ejected_until
+
+    def describe(self, best_head):
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "?"
+        lag = best_head - self.head if self.head is not None else "?"
+        return f"{self.uri} latency={latency} headLag={lag}" + (
+            " ejected" if self.ejected() else ""
+        )
+
+
+class RPCEndpointPool(BaseProvider):
+    # a web3 provider over several JSON-RPC endpoints: reads go to the fastest node that
+    # is keeping up with the chain and fail over to the next one, raw txs are broadcast
+    # to several nodes at once so they reach block producers sooner
+    def __init__(
+        self,
+        endpoint_uris,
+        broadcast_fanout=3,
+        max_head_lag=3,
+        probe_interval=5.0,
+        eject_after=3,
+        eject_for=30.0,
+        timeout=10,
+        limiter: RateLimiter = None,
+    ):
+        super().__init__()
+        if not endpoint_uris:
+            raise ValueError("no RPC endpoints given")
+        self.nodes = [RPCNode(uri) for uri in endpoint_uris]
+        self.broadcast_fanout = broadcast_fanout
+        self.max_head_lag = max_head_lag
+        self.probe_interval = probe_interval
+        self.eject_after = eject_after
+        self.eject_for = eject_for
+        self.timeout = timeout
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.request_counter = itertools.count()
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(self.nodes), thread_name_prefix="rpc"
+        )
+        # broadcasts get their own threads, so ones stuck on a hung node never hold up the
+        # health probes that would eject it; room for a few rounds stuck at once
+        self.broadcast_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4 * len(self.nodes), thread_name_prefix="broadcast"
+        )
+        self.logger = logformat.get_logger("RPC")
+        self.preferred = None
+
+    def ranked(self):
+        # nodes in order of preference: healthy ones by latency, then lagging ones, then
+        # ejected ones as a last resort, so there is always somewhere to send to
+        with self.lock:
+            best_head = max(
+                (n.head for n in self.nodes if n.head is not None), default=0
+            )
+
+            def rank(node):
+                lagging = (
+                    node.head is not None and best_head - node.head > self.max_head_lag
+                )
+                latency = node.latency if node.latency is not None else float("inf")
+                return (node.ejected(), lagging, latency)
+
+            return sorted(self.nodes, key=rank)
+
+    def make_request(self, method, params):
+        return self.request(
+            {
+                "jsonrpc": "2.0",
+                "method": method,
+                "params": params or [],
+                "id": next(self.request_counter),
+            }
+        )
+
+    def isConnected(self):
+        # connected as long as some node hasn't been ejected for failing
+        return any(not node.ejected() for node in self.nodes)
+
+    def request(self, payload):
+        # payload is one JSON-RPC request object or a batch of them
+        calls = payload if isinstance(payload, list) else [payload]
+        if all(c["method"] == "eth_sendRawTransaction" for c in calls):
+            return self._broadcast(payload)
+        return self._failover(payload)
+
+    def _post(self, node, payload, priority=RateLimiter.READ):
+        self.limiter.acquire(priority, len(payload) if isinstance(payload, list) else 1)
+        try:
+            raw_response = make_post_request(
+                node.uri,
+                json.dumps(payload).encode(),
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+            )
+            response = json.loads(raw_response)
+        except (requests.RequestException, ValueError) as ex:
+            self.limiter.failed(ex)
+            self._failed(node, ex)
+            raise
+        self.limiter.succeeded()
+        with self.lock:
+            node.failures = 0
+        return response
+
+    def _failed(self, node, ex):
+        with self.lock:
+            node.failures += 1
+            if node.failures < self.eject_after or node.ejected():
+                return
+            node.ejected_until = time.monotonic() + self.eject_for
+        self.logger.warning(
+            f"Ejecting RPC endpoint {node.uri} for {self.eject_for}s"
+            f" after {node.failures} failures: {ex!r}"
+        )
+
+    def _failover(self, payload, nodes=None, priority=RateLimiter.READ):
+        last_ex = None
+        for node in nodes if nodes is not None else self.ranked():
+            try:
+                return self._post(node, payload, priority)
+            except (requests.RequestException, ValueError) as ex:
+                last_ex = ex
+        raise last_ex
+
+    def _broadcast(self, payload):
+        # a tx any of the nodes accepted is on its way to the block producers, whatever the
+        # others say (a slower node may answer "already known" or, once it is mined, "nonce
+        # too low"); only when all of them reject it is the preferred node's error reported.
+        # Returns as soon as every tx has been accepted somewhere, so a hung node costs
+        # nothing while another one answers
+        nodes = self.ranked()
+        # ejected nodes only get the tx when there is nothing else to send it to
+        nodes = [n for n in nodes if not n.ejected()] or nodes
+        fanout = self.broadcast_fanout
+        targets, rest = nodes[:fanout], nodes[fanout:]
+        futures = {
+            self.broadcast_executor.submit(
+                self._post, node, payload, RateLimiter.SEND
+            ): rank
+            for rank, node in enumerate(targets)
+        }
+        responses = {}
+        pending = set(futures)
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    responses[futures[future]] = future.result()
+            if responses:
+                merged = RPCEndpointPool._merged(
+                    [responses[rank] for rank in sorted(responses)]
+                )
+                if RPCEndpointPool._all_accepted(merged):
+                    return merged
+        if not responses:
+            return self._failover(payload, rest or targets, RateLimiter.SEND)
+        return merged
+
+    @staticmethod
+    def _merged(responses):
+        # the first (i.e. best ranked) node's response, with every error in it replaced
+        # by another node's acceptance of the same call where there is one
+        primary, others = responses[0], responses[1:]
+        if not isinstance(primary, list):
+            return RPCEndpointPool._accepted(primary, others)
+        return [
+            RPCEndpointPool._accepted(
+                response,
+                [
+                    r
+                    for other in others
+                    if isinstance(other, list)
+                    for r in other
+                    if r.get("id") == response.get("id")
+                ],
+            )
+            for response in primary
+        ]
+
+    @staticmethod
+    def _all_accepted(response):
+        responses = response if isinstance(response, list) else [response]
+        return all("error" not in r for r in responses)
+
+    @staticmethod
+    def _accepted(response, alternatives):
+        if "error" not in response:
+            return response
+        return next((r for r in alternatives if "error" not in r), response)
+
+    def probe(self):
+        # reads every node's head at once, ejected ones included so they are ranked on fresh
+        # numbers when let back in; the round trip doubles as the latency sample
+        def probe_one(node):
+            started = time.monotonic()
+            response = self._post(
+                node,
+                {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 0},
+            )
+            return int(response["result"], 16), time.monotonic() - started
+
+        futures = [self.executor.submit(probe_one, node) for node in self.nodes]
+        for node, future in zip(self.nodes, futures):
+            if future.exception() is not None:
+                continue
+            head, latency = future.result()
+            with self.lock:
+                node.head = head
+                node.latency = (
+                    latency
+                    if node.latency is None
+                    else 0.7 * node.latency + 0.3 * latency
+                )
+
+        preferred = self.ranked()[0]
+        if preferred is not self.preferred:
+            self.preferred = preferred
+            best_head = max(
+                (n.head for n in self.nodes if n.head is not None), default=0
+            )
+            described = ", ".join(n.describe(best_head) for n in self.ranked())
+            self.logger.info(f"Preferred RPC endpoint {described}")
+
+    def start(self):
+        # a single endpoint has nothing to choose between
+        if len(self.nodes) > 1:
+            threading.Thread(target=self.__probe_forever, daemon=True).start()
+
+    def __probe_forever(self):
+        while True:
+            try:
+                self.probe()
+            except Exception as ex:
+                self.logger.warning(f"RPC endpoint probe failed: {ex!r}")
+            time.sleep(self.probe_interval)
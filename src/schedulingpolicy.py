@@ -0,0 +1,203 @@
+import collections
+import heapq
+import itertools
+
+
+def parse_chain_map(value):
+    # "1:3,137:1" -> {1: 3.0, 137: 1.0}
+    if not value:
+        return {}
+    chain_map = {}
+    for entry in value.split(","):
+        chainId, _, number = entry.partition(":")
+        chain_map[int(chainId)] = float(number)
+    return chain_map
+
+
+class SchedulingPolicy:
+    # decides which queued sessions a lane sends next; subclasses pick the order, the
+    # base class applies the per-chain rate caps and keeps the per-chain lag statistics.
+    # Not thread-safe: the lane calls it under its own lock.
+    ODF = "odf"
+    WRR = "wrr"
+
+    @staticmethod
+    def create(name, chain_weights=None, chain_rate_caps=None):
+        if name == SchedulingPolicy.ODF:
+            return OldestDeadlineFirst(chain_rate_caps)
+        if name == SchedulingPolicy.WRR:
+            return WeightedRoundRobin(chain_weights, chain_rate_caps)
+        raise ValueError(f"unknown scheduling policy {name}")
+
+    def __init__(self, chain_rate_caps=None):
+        # chainId -> sessions per minute
+        self.chain_rate_caps = chain_rate_caps or {}
+        # chainId -> [tokens, refilled_at]; a cap allows bursts of 10 seconds' worth
+        self.buckets = {}
+        self.seq = itertools.count()
+        self.queued = 0
+        # chainId -> sessions queued
+        self.queued_by_chain = collections.Counter()
+        # chainId -> [finalized, total lag, max lag] since the last lag_metrics()
+        self.lags = {}
+
+    def __len__(self):
+        return self.queued
+
+    def queued_for(self, chainId):
+        return self.queued_by_chain[chainId]
+
+    def _queued(self, session):
+        self.queued += 1
+        self.queued_by_chain[session.chainId] += 1
+
+    def _taken(self, sessions):
+        self.queued -= len(sessions)
+        for session in sessions:
+            self.queued_by_chain[session.chainId] -= 1
+            if not self.queued_by_chain[session.chainId]:
+                del self.queued_by_chain[session.chainId]
+
+    def __bucket(self, chainId, now):
+        cap = self.chain_rate_caps[chainId]
+        burst = max(1.0, cap / 6)
+        bucket = self.buckets.setdefault(chainId, [burst, now])
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * cap / 60)
+        bucket[1] = now
+        return bucket
+
+    def allowed(self, chainId, now):
+        if chainId not in self.chain_rate_caps:
+            return True
+        return self.__bucket(chainId, now)[0] >= 1
+
+    def consume(self, chainId, now):
+        if chainId in self.chain_rate_caps:
+            self.__bucket(chainId, now)[0] -= 1
+
+    def wait_hint(self, now):
+        # seconds until a capped chain with queued sessions may send again
+        waits = [
+            (1 - self.__bucket(chainId, now)[0]) * 60 / self.chain_rate_caps[chainId]
+            for chainId in self.queued_chains()
+            if not self.allowed(chainId, now)
+        ]
+        return max(0.0, min(waits)) if waits else None
+
+    def record_finalized(self, sessions, observer_chain_block_height):
+        # lag is how many observer blocks past its deadline a session got finalized at
+        for session in sessions:
+            lag = max(0, observer_chain_block_height - session.deadline)
+            stats = self.lags.setdefault(session.chainId, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += lag
+            stats[2] = max(stats[2], lag)
+
+    def lag_metrics(self):
+        # chainId -> (finalized, mean lag, max lag) since the previous call
+        lags, self.lags = self.lags, {}
+        return {
+            chainId: (count, total / count, worst)
+            for chainId, (count, total, worst) in sorted(lags.items())
+        }
+
+    def push(self, session, queued_at):
+        raise NotImplementedError
+
+    def take(self, count, now):
+        raise NotImplementedError
+
+    def queued_chains(self):
+        raise NotImplementedError
+
+    def oldest_queued_at(self):
+        raise NotImplementedError
+
+
+class OldestDeadlineFirst(SchedulingPolicy):
+    # one queue for all chains, earliest deadline first
+    def __init__(self, chain_rate_caps=None):
+        super().__init__(chain_rate_caps)
+        # min-heap of (deadline, seq, queued_at, session)
+        self.heap = []
+
+    def push(self, session, queued_at):
+        heapq.heappush(
+            self.heap, (session.deadline, next(self.seq), queued_at, session)
+        )
+        self._queued(session)
+
+    def take(self, count, now):
+        taken = []
+        held_back = []
+        while self.heap and len(taken) < count:
+            entry = heapq.heappop(self.heap)
+            session = entry[3]
+            if not self.allowed(session.chainId, now):
+                held_back.append(entry)
+                continue
+            self.consume(session.chainId, now)
+            taken.append(session)
+        for entry in held_back:
+            heapq.heappush(self.heap, entry)
+        self._taken(taken)
+        return taken
+
+    def queued_chains(self):
+        return {entry[3].chainId for entry in self.heap}
+
+    def oldest_queued_at(self):
+        return min((entry[2] for entry in self.heap), default=None)
+
+
+class WeightedRoundRobin(SchedulingPolicy):
+    # a queue per chain, earliest deadline first within each, served in proportion to the
+    # chains' weights (1 unless configured) so that a backlog on one chain can't starve
+    # the others
+    def __init__(self, chain_weights=None, chain_rate_caps=None):
+        super().__init__(chain_rate_caps)
+        self.chain_weights = chain_weights or {}
+        # chainId -> min-heap of (deadline, seq, queued_at, session)
+        self.heaps = collections.defaultdict(list)
+        # smooth weighted round-robin state, chainId -> current weight
+        self.current = collections.defaultdict(float)
+
+    def push(self, session, queued_at):
+        heapq.heappush(
+            self.heaps[session.chainId],
+            (session.deadline, next(self.seq), queued_at, session),
+        )
+        self._queued(session)
+
+    def take(self, count, now):
+        taken = []
+        while len(taken) < count:
+            eligible = [
+                chainId
+                for chainId, heap in self.heaps.items()
+                if heap and self.allowed(chainId, now)
+            ]
+            if not eligible:
+                break
+            total = 0.0
+            for chainId in eligible:
+                weight = self.chain_weights.get(chainId, 1.0)
+                self.current[chainId] += weight
+                total += weight
+            chainId = max(eligible, key=lambda c: self.current[c])
+            self.current[chainId] -= total
+            self.consume(chainId, now)
+            taken.append(heapq.heappop(self.heaps[chainId])[3])
+            if not self.heaps[chainId]:
+                del self.heaps[chainId]
+                del self.current[chainId]
+        self._taken(taken)
+        return taken
+
+    def queued_chains(self):
+        return set(self.heaps)
+
+    def oldest_queued_at(self):
+        return min(
+            (entry[2] for heap in self.heaps.values() for entry in heap), default=None
+        )
@@ -0,0 +1,228 @@
+import heapq
+import itertools
+import sys
+import threading
+
+
+class SessionRegistry:
+    TO_BE_FINALIZED = "to_be_finalized"
+    TO_BE_CONFIRMED = "to_be_confirmed"
+    STATES = (TO_BE_FINALIZED, TO_BE_CONFIRMED)
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.lock = threading.Lock()
+        # signalled whenever a session leaves the to be finalized state
+        self.room = threading.Condition(self.lock)
+        # most sessions held to be finalized before producers are made to wait, None for
+        # no limit
+        self.capacity = None
+        # called, outside the lock, when a session becomes due to be finalized before the
+        # consumer next looks, i.e. with a deadline below the last height popped at
+        self.on_due = None
+        self.popped_height = None
+        # deadline queue entries of sessions rescheduled after a failed attempt, held back
+        # until the next observer block as the consumer may look again before then
+        self.rescheduled = []
+        # state -> chainId -> blockHeight -> request; a session is in at most one state
+        self.sessions = {state: {} for state in SessionRegistry.STATES}
+        self.counts = {state: 0 for state in SessionRegistry.STATES}
+        # chainId -> min-heap of (deadline, seq, request) over sessions to be finalized, so
+        # the consumer can take each chain's due sessions up to its own limit; entries
+        # whose request has since moved on are dropped lazily when popped
+        self.deadline_queues = {}
+        # min-heap of (session_started_block_id, seq, request) over every session that is
+        # still to be finalized or confirmed, with the same lazy deletion
+        self.outstanding_queue = []
+        # min-heap of (finalized_time, seq, request) over sessions to be confirmed, the
+        # timers for refinalizing the ones whose confirmation never shows up; an entry is
+        # stale once its request has moved on or been finalized again since
+        self.confirmation_queue = []
+        self.seq = itertools.count()
+
+    def __get(self, state, chainId, blockHeight):
+        reqs_for_chain = self.sessions[state].get(chainId)
+        if reqs_for_chain is None:
+            return None
+        return reqs_for_chain.get(blockHeight)
+
+    def __put(self, state, fr):
+        self.sessions[state].setdefault(fr.chainId, {})[fr.blockHeight] = fr
+        self.counts[state] += 1
+        if state == SessionRegistry.TO_BE_FINALIZED:
+            self.__push_deadline((fr.deadline, next(self.seq), fr))
+        elif fr.finalized_time is not None:
+            heapq.heappush(
+                self.confirmation_queue, (fr.finalized_time, next(self.seq), fr)
+            )
+
+    def __push_deadline(self, entry):
+        heapq.heappush(self.deadline_queues.setdefault(entry[2].chainId, []), entry)
+
+    def __pop(self, state, chainId, blockHeight):
+        reqs_for_chain = self.sessions[state].get(chainId)
+        if reqs_for_chain is None:
+            return None
+        fr = reqs_for_chain.pop(blockHeight, None)
+        if fr is not None:
+            self.counts[state] -= 1
+            if state == SessionRegistry.TO_BE_FINALIZED:
+                self.room.notify_all()
+            if not reqs_for_chain:
+                del self.sessions[state][chainId]
+        return fr
+
+    def __is_outstanding(self, fr):
+        return any(
+            self.__get(state, fr.chainId, fr.blockHeight) is fr
+            for state in SessionRegistry.STATES
+        )
+
+    def lookup(self, state, chainId, blockHeight):
+        # single dict reads are atomic, so lookups don't need the lock
+        return self.__get(state, chainId, blockHeight)
+
+    def contains(self, state, chainId, blockHeight) -> bool:
+        return self.__get(state, chainId, blockHeight) is not None
+
+    def count(self, state) -> int:
+        return self.counts[state]
+
+    def __is_due(self, state, fr):
+        if state != SessionRegistry.TO_BE_FINALIZED or self.popped_height is None:
+            return False
+        return fr.deadline < self.popped_height
+
+    def __notify_due(self):
+        on_due = self.on_due
+        if on_due is not None:
+            on_due()
+
+    def wait_for_room(self, timeout=None) -> bool:
+        # blocks a producer while the to be finalized sessions are at capacity; returns
+        # whether there is room
+        with self.room:
+            return self.room.wait_for(self.__has_room, timeout=timeout)
+
+    def __has_room(self):
+        if self.capacity is None:
+            return True
+        return self.counts[SessionRegistry.TO_BE_FINALIZED] < self.capacity
+
+    def add(self, state, fr) -> bool:
+        with self.lock:
+            for s in SessionRegistry.STATES:
+                if self.__get(s, fr.chainId, fr.blockHeight) is not None:
+                    return False
+            self.__put(state, fr)
+            heapq.heappush(
+                self.outstanding_queue,
+                (fr.session_started_block_id, next(self.seq), fr),
+            )
+            due = self.__is_due(state, fr)
+        if due:
+            self.__notify_due()
+        return True
+
+    def remove(self, state, chainId, blockHeight):
+        with self.lock:
+            return self.__pop(state, chainId, blockHeight)
+
+    def transition(self, fr, from_state, to_state) -> bool:
+        # moves the session atomically, so other threads never observe it in neither state
+        with self.lock:
+            if self.__get(from_state, fr.chainId, fr.blockHeight) is not fr:
+                return False
+            self.__pop(from_state, fr.chainId, fr.blockHeight)
+            self.__put(to_state, fr)
+            due = self.__is_due(to_state, fr)
+        if due:
+            self.__notify_due()
+        return True
+
+    def reschedule(self, fr):
+        with self.lock:
+            if (
+                self.__get(SessionRegistry.TO_BE_FINALIZED, fr.chainId, fr.blockHeight)
+                is fr
+            ):
+                self.rescheduled.append((fr.deadline, next(self.seq), fr))
+
+    def pop_ready(self, observer_chain_block_height, limit=None) -> []:
+        # limit(chainId) caps how many of a chain's due sessions are popped, so a backlog
+        # on one chain never keeps the others' out; sessions popped here stay to be
+        # finalized, and count against the capacity, until they are sent, and the ones
+        # left over are popped next time
+        frs = []
+        with self.lock:
+            new_height = self.popped_height is None
+            if not new_height:
+                new_height = observer_chain_block_height > self.popped_height
+            if new_height:
+                for entry in self.rescheduled:
+                    self.__push_deadline(entry)
+                self.rescheduled = []
+            self.popped_height = observer_chain_block_height
+            for chainId in list(self.deadline_queues):
+                queue = self.deadline_queues[chainId]
+                room = limit(chainId) if limit is not None else len(queue)
+                popped = 0
+                while queue and queue[0][0] < observer_chain_block_height:
+                    if popped >= room:
+                        break
+                    _, _, fr = heapq.heappop(queue)
+                    current = self.__get(
+                        SessionRegistry.TO_BE_FINALIZED, fr.chainId, fr.blockHeight
+                    )
+                    if current is fr:
+                        frs.append(fr)
+                        popped += 1
+                if not queue:
+                    del self.deadline_queues[chainId]
+        return frs
+
+    def pop_unconfirmed(self, finalized_before, limit) -> []:
+        # sessions still to be confirmed that were finalized before the cutoff, at most
+        # limit of them; costs O(expired) plus the stale entries it passes over
+        frs = []
+        with self.lock:
+            queue = self.confirmation_queue
+            while queue and queue[0][0] < finalized_before and len(frs) < limit:
+                finalized_time, _, fr = heapq.heappop(queue)
+                current = self.__get(
+                    SessionRegistry.TO_BE_CONFIRMED, fr.chainId, fr.blockHeight
+                )
+                if current is fr and fr.finalized_time == finalized_time:
+                    frs.append(fr)
+        return frs
+
+    def oldest_outstanding_block_id(self):
+        with self.lock:
+            queue = self.outstanding_queue
+            while queue and not self.__is_outstanding(queue[0][2]):
+                heapq.heappop(queue)
+            return queue[0][0] if queue else None
+
+    def memory_footprint(self):
+        # approximate (sessions, bytes) held by the registry and its queues
+        sessions = 0
+        size = 0
+        for state in SessionRegistry.STATES:
+            size += sys.getsizeof(self.sessions[state])
+            for reqs_for_chain in list(self.sessions[state].values()):
+                size += sys.getsizeof(reqs_for_chain)
+                for fr in list(reqs_for_chain.values()):
+                    sessions += 1
+                    size += sys.getsizeof(fr) + sum(
+                        sys.getsizeof(getattr(fr, f))
+                        for cls in type(fr).__mro__
+                        for f in getattr(cls, "__slots__", ())
+                    )
+        for queue in (
+            *self.deadline_queues.values(),
+            self.rescheduled,
+            self.outstanding_queue,
+            self.confirmation_queue,
+        ):
+            size += sys.getsizeof(queue) + sum(sys.getsizeof(e) for e in list(queue))
+        return sessions, size